@@ -1,8 +1,18 @@
 # SISTEMA DE GESTIÓN DE INVENTARIOS
 
+import os
+import sys
+
+# Importación/exportación compartida de Parcial 02 (carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from persistencia import InformeCarga, cargar_por_lotes, exportar_registros, leer_registros, validar_registro
+
+
 class Producto:
     """Clase que representa un producto del inventario."""
 
+    __slots__ = ("id", "nombre", "cantidad", "precio")  # sin __dict__ por instancia
+
     def __init__(self, id, nombre, cantidad, precio):
         self.id = id
         self.nombre = nombre
@@ -83,6 +93,29 @@ class Inventario:
         """Devuelve todos los productos del inventario."""
         return self.productos
 
+    def importar(self, ruta, tam_lote=5000, progreso=None):
+        """Importa productos de un CSV, JSON Lines o JSON por lotes.
+
+        Valida cada registro con las reglas de Semana 11 y descarta los IDs
+        repetidos; devuelve un InformeCarga con lo que no se pudo cargar.
+        """
+        ids = {p.get_id() for p in self.productos}  # evita el recorrido de agregar_producto
+
+        def anadir_lote(lote):
+            self.productos.extend(lote)
+            ids.update(p.get_id() for p in lote)
+
+        informe = InformeCarga(origen=ruta)
+        cargar_por_lotes(leer_registros(ruta), lambda registro: Producto(*validar_registro(registro)),
+                         ids.__contains__, anadir_lote, informe, tam_lote, progreso)
+        return informe
+
+    def exportar(self, ruta):
+        """Exporta los productos a CSV, JSON Lines o JSON; devuelve cuántos se escribieron."""
+        return exportar_registros(ruta, ({"id": p.get_id(), "nombre": p.get_nombre(),
+                                          "cantidad": p.get_cantidad(), "precio": p.get_precio()}
+                                         for p in self.productos))
+
 
 def menu():
     inventario = Inventario()
@@ -95,7 +128,9 @@ def menu():
         print("4. Actualizar precio de producto")
         print("5. Buscar producto por nombre")
         print("6. Mostrar todos los productos")
-        print("7. Salir")
+        print("7. Importar productos (CSV, JSON Lines o JSON)")
+        print("8. Exportar productos (CSV, JSON Lines o JSON)")
+        print("9. Salir")
 
         opcion = input("Seleccione una opción: ")
 
@@ -165,6 +200,28 @@ def menu():
                 print("📭 Inventario vacío.")
 
         elif opcion == "7":
+            ruta = input("Ingrese el archivo a importar: ")
+            try:
+                informe = inventario.importar(ruta)
+            except (OSError, ValueError) as e:
+                print(f"❌ Error: {e}")
+                continue
+            print(f"✅ {informe.cargados} productos importados.")
+            if informe.duplicados:
+                print(f"⚠ {len(informe.duplicados)} IDs duplicados ignorados")
+            for posicion, motivo in informe.invalidos[:10]:
+                print(f"⚠ Registro {posicion} inválido: {motivo}")
+
+        elif opcion == "8":
+            ruta = input("Ingrese el archivo de destino: ")
+            try:
+                total = inventario.exportar(ruta)
+            except (OSError, ValueError) as e:
+                print(f"❌ Error: {e}")
+                continue
+            print(f"✅ {total} productos exportados a {ruta}")
+
+        elif opcion == "9":
             print("👋 Saliendo del sistema... Hasta pronto!")
             break
 
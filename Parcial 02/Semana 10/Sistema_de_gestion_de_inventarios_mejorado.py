@@ -2,12 +2,27 @@
 # SISTEMA DE GESTIÓN DE INVENTARIOS MEJORADO
 # ==============================
 
+import atexit
+import functools
 import os
 import json
+import queue
+import shutil
+import sys
+import threading
+from contextlib import ExitStack
+
+# Persistencia compartida de Parcial 02 (carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from persistencia import (InformeCarga, cargar_por_lotes, escribir_json_atomico, exportar_registros,
+                          leer_json_con_respaldo, leer_registros, validar_registro)
+
 
 class Producto:
     """Clase que representa un producto del inventario."""
 
+    __slots__ = ("id", "nombre", "cantidad", "precio")  # sin __dict__ por instancia
+
     def __init__(self, id, nombre, cantidad, precio):
         self.id = id
         self.nombre = nombre
@@ -25,85 +40,395 @@ class Producto:
         return f"ID: {self.id} | Nombre: {self.nombre} | Cantidad: {self.cantidad} | Precio: ${self.precio:.2f}"
 
 
+def _esperar_diario(operacion):
+    """Con el escritor de fondo y POLITICA_FSYNC = "siempre", la operación no
+    vuelve hasta que su registro está sincronizado en disco. La espera ocurre
+    ya fuera de los bloqueos, para que otros hilos sigan encolando cambios."""
+    @functools.wraps(operacion)
+    def envoltura(self, *args, **kwargs):
+        resultado = operacion(self, *args, **kwargs)
+        escrito = getattr(self._pendiente, "evento", None)
+        if escrito is not None:
+            self._pendiente.evento = None
+            escrito.wait()
+        return resultado
+    return envoltura
+
+
 class Inventario:
-    """Clase que representa el inventario de la tienda."""
+    """Clase que representa el inventario de la tienda.
+
+    Cada operación se registra como una línea JSON compacta en un diario de
+    cambios (append-only) junto a inventario.JSON. Cuando el diario crece lo
+    suficiente, se compacta en segundo plano dentro del archivo principal.
+
+    Es seguro usarlo desde varios hilos: cada producto se protege con uno de
+    N_FRANJAS bloqueos (bloqueo por franjas) y las altas/bajas con un bloqueo
+    de estructura. Con concurrente=True las escrituras al diario las hace un
+    único hilo de fondo que agrupa varias operaciones por fsync; con la
+    política "siempre" cada operación espera a que su grupo esté en disco, con
+    "lote" o "nunca" vuelve en cuanto el cambio queda encolado y los últimos
+    cambios se pierden si el proceso muere antes de cerrar(). cerrar() se
+    registra con atexit, así una salida normal o un Ctrl+C no los descartan.
+    """
 
     ARCHIVO = "inventario.JSON"  # <- cambio aplicado aquí
+    ARCHIVO_DIARIO = "inventario.JSON.log"
+
+    # Política de fsync del diario: "siempre" (cada operación), "lote"
+    # (cada FSYNC_CADA operaciones) o "nunca" (lo decide el sistema operativo)
+    POLITICA_FSYNC = "siempre"
+    FSYNC_CADA = 100
+    # Tamaño mínimo del diario (en bytes) antes de compactar
+    UMBRAL_COMPACTACION = 1024 * 1024
+    N_FRANJAS = 64
+
+    def __init__(self, politica_fsync=None, umbral_compactacion=None, concurrente=False):
+        if politica_fsync is not None:
+            if politica_fsync not in ("siempre", "lote", "nunca"):
+                raise ValueError(f"Política de fsync desconocida: {politica_fsync}")
+            self.POLITICA_FSYNC = politica_fsync
+        if umbral_compactacion is not None:
+            self.UMBRAL_COMPACTACION = umbral_compactacion
 
-    def __init__(self):
         self.productos = {}  # Diccionario con ID como clave
+        self._bloqueo = threading.Lock()  # protege el diario y la compactación
+        self._diario = None
+        self._bytes_diario = 0
+        self._bytes_snapshot = 0
+        self._sin_fsync = 0
+        self._compactador = None
+        self._bloqueo_estructura = threading.Lock()  # altas y bajas de productos
+        self._franjas = [threading.Lock() for _ in range(self.N_FRANJAS)]
         self.cargar_desde_archivo()  # Recuperación automática al iniciar
 
+        # Escritor único del diario en modo concurrente
+        self._cola = None
+        self._escritor = None
+        self._pendiente = threading.local()  # evento de escritura que espera este hilo
+        if concurrente:
+            self._cola = queue.Queue()
+            self._escritor = threading.Thread(target=self._escribir_en_fondo, daemon=True)
+            self._escritor.start()
+        atexit.register(self.cerrar)
+
+    def _franja(self, id):
+        """Bloqueo que protege al producto con ese ID."""
+        return self._franjas[hash(id) % self.N_FRANJAS]
+
     # ----------------------------
     # Almacenamiento en archivo
     # ----------------------------
-    def guardar_en_archivo(self):
+    def guardar_en_archivo(self, productos_dict=None):
+        """Escribe el snapshot completo del inventario en inventario.JSON."""
+        if productos_dict is None:
+            productos_dict = {id: p.to_dict() for id, p in self.productos.items()}
         try:
-            with open(self.ARCHIVO, "w", encoding="utf-8") as f:
-                productos_dict = {id: p.to_dict() for id, p in self.productos.items()}
-                json.dump(productos_dict, f, indent=4)
+            escribir_json_atomico(self.ARCHIVO, productos_dict, indent=4)
+            self._bytes_snapshot = os.path.getsize(self.ARCHIVO)
+            return True
         except PermissionError:
             print("❌ Error: no se tienen permisos para escribir en el archivo.")
+            return False
+
+    # ----------------------------
+    # Diario de cambios
+    # ----------------------------
+    def _abrir_diario(self):
+        self._diario = open(self.ARCHIVO_DIARIO, "ab")
+        self._bytes_diario = self._diario.tell()
+
+    def _registrar(self, registro):
+        """Añade una operación al diario; el coste no depende del tamaño del inventario.
+
+        Se llama con el bloqueo del producto tomado, así el orden del diario
+        respeta el orden en que se aplicaron los cambios a cada producto.
+        """
+        linea = json.dumps(registro, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+        if self._cola is not None:
+            escrito = threading.Event() if self.POLITICA_FSYNC == "siempre" else None
+            self._cola.put((linea, escrito))
+            self._pendiente.evento = escrito
+        else:
+            self._escribir_lineas([linea])
+
+    def _escribir_en_fondo(self):
+        # Toma todo lo pendiente de la cola y lo escribe de una vez;
+        # elementos (línea, evento) y None para terminar
+        while True:
+            elementos = [self._cola.get()]
+            while True:
+                try:
+                    elementos.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            fin = None in elementos
+            elementos = [e for e in elementos if e is not None]
+            try:
+                self._escribir_lineas([linea for linea, _ in elementos])
+            finally:
+                # Se avisa aunque la escritura falle: nadie se queda esperando
+                for _, escrito in elementos:
+                    if escrito is not None:
+                        escrito.set()
+                for _ in range(len(elementos) + fin):
+                    self._cola.task_done()
+            if fin:
+                return
+
+    def _escribir_lineas(self, lineas):
+        if not lineas:
+            return
+        with self._bloqueo:
+            if self._diario is None:
+                return
+            try:
+                self._diario.write(b"".join(lineas))
+                self._diario.flush()
+                self._sin_fsync += len(lineas)
+                if self.POLITICA_FSYNC == "siempre" or (
+                        self.POLITICA_FSYNC == "lote" and self._sin_fsync >= self.FSYNC_CADA):
+                    os.fsync(self._diario.fileno())
+                    self._sin_fsync = 0
+            except PermissionError:
+                print("❌ Error: no se tienen permisos para escribir en el diario.")
+                return
+            self._bytes_diario += sum(len(l) for l in lineas)
+
+            # Se compacta cuando el diario supera al snapshot: así el coste de
+            # reescribir el archivo completo se reparte entre muchas operaciones
+            umbral = max(self.UMBRAL_COMPACTACION, self._bytes_snapshot)
+            if self._bytes_diario >= umbral and self._compactador is None:
+                self._iniciar_compactacion()
+
+    def _iniciar_compactacion(self):
+        """Rota el diario y escribe el snapshot en un hilo de fondo (requiere el bloqueo)."""
+        if os.path.exists(self.ARCHIVO_DIARIO + ".1"):
+            # Una compactación anterior falló: no se pisa su diario rotado
+            return
+        self._diario.close()
+        os.replace(self.ARCHIVO_DIARIO, self.ARCHIVO_DIARIO + ".1")
+        self._abrir_diario()
+        # dict() copia de forma atómica aunque otros hilos añadan productos
+        productos_dict = {id: p.to_dict() for id, p in dict(self.productos).items()}
+        self._compactador = threading.Thread(target=self._compactar, args=(productos_dict,), daemon=True)
+        self._compactador.start()
+
+    def _compactar(self, productos_dict):
+        # El diario rotado se retira solo cuando el snapshot ya está en disco;
+        # se conserva junto al .bak para poder rehacer el snapshot desde él
+        if self.guardar_en_archivo(productos_dict):
+            os.replace(self.ARCHIVO_DIARIO + ".1", self.ARCHIVO_DIARIO + ".bak")
+        with self._bloqueo:
+            self._compactador = None
+
+    def _aplicar(self, registro):
+        """Reaplica una operación del diario sobre el estado en memoria."""
+        op = registro["op"]
+        if op == "agregar":
+            producto = Producto.from_dict(registro["producto"])
+            self.productos[producto.id] = producto
+        elif op == "lote":
+            for datos in registro["productos"]:
+                producto = Producto.from_dict(datos)
+                self.productos[producto.id] = producto
+        elif op == "eliminar":
+            self.productos.pop(registro["id"], None)
+        elif op == "cantidad" and registro["id"] in self.productos:
+            self.productos[registro["id"]].cantidad = registro["valor"]
+        elif op == "precio" and registro["id"] in self.productos:
+            self.productos[registro["id"]].precio = registro["valor"]
+
+    def _reproducir_diario(self, ruta):
+        """Reaplica un diario; devuelve cuántas operaciones se recuperaron."""
+        if not os.path.exists(ruta):
+            return 0
+        aplicadas = 0
+        with open(ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Última línea incompleta por un cierre inesperado
+                    break
+                self._aplicar(registro)
+                aplicadas += 1
+        return aplicadas
+
+    def _anadir_al_rotado(self):
+        """Copia el diario actual al final del diario rotado (.1).
+
+        Antes se descarta una última línea incompleta del rotado: la
+        reproducción se detiene en ella y perdería todo lo añadido detrás.
+        """
+        if not os.path.exists(self.ARCHIVO_DIARIO):
+            return
+        with open(self.ARCHIVO_DIARIO + ".1", "r+b") as destino:
+            corte = destino.seek(0, os.SEEK_END)
+            while corte > 0:
+                inicio = max(0, corte - (1 << 16))
+                destino.seek(inicio)
+                salto = destino.read(corte - inicio).rfind(b"\n")
+                if salto >= 0:
+                    corte = inicio + salto + 1
+                    break
+                corte = inicio
+            destino.truncate(corte)
+            destino.seek(corte)
+            with open(self.ARCHIVO_DIARIO, "rb") as origen:
+                shutil.copyfileobj(origen, destino)
+            destino.flush()
+            os.fsync(destino.fileno())
+
+    def cerrar(self):
+        """Vacía la cola del escritor, espera a la compactación pendiente y cierra el diario.
+
+        Se puede llamar más de una vez; también se ejecuta al salir del programa.
+        """
+        atexit.unregister(self.cerrar)
+        if self._escritor is not None:
+            self._cola.put(None)
+            self._escritor.join()
+            self._escritor = None
+            self._cola = None
+        compactador = self._compactador
+        if compactador is not None:
+            compactador.join()
+        with self._bloqueo:
+            if self._diario is not None:
+                self._diario.flush()
+                os.fsync(self._diario.fileno())
+                self._diario.close()
+                self._diario = None
 
     # ----------------------------
     # Recuperación desde archivo
     # ----------------------------
     def cargar_desde_archivo(self):
-        """Carga el inventario desde el archivo inventario.JSON"""
-        if not os.path.exists(self.ARCHIVO):
+        """Carga el inventario desde inventario.JSON y reaplica el diario de cambios."""
+        if not os.path.exists(self.ARCHIVO) and not os.path.exists(self.ARCHIVO + ".bak"):
             try:
                 with open(self.ARCHIVO, "w", encoding="utf-8") as f:
                     json.dump({}, f)
-                print("📭 Inventario vacío al iniciar el programa.")
             except PermissionError:
                 print("❌ Error: no se tienen permisos para crear el archivo de inventario.")
-            return
+                return
 
         try:
-            with open(self.ARCHIVO, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.productos = {id: Producto.from_dict(p) for id, p in data.items()}
+            data = leer_json_con_respaldo(self.ARCHIVO)
+            if data is None:
+                # Ni el archivo ni su copia sirven: se aparta para no perderlo
+                # (puede quedar solo el .bak si el principal no existe)
+                ilegible = self.ARCHIVO if os.path.exists(self.ARCHIVO) else self.ARCHIVO + ".bak"
+                os.replace(ilegible, ilegible + ".corrupto")
+                print(f"⚠ Inventario ilegible, se conserva en {ilegible}.corrupto.")
+                data = {}
+            self.productos = {id: Producto.from_dict(p) for id, p in data.items()}
+            if os.path.exists(self.ARCHIVO):
+                self._bytes_snapshot = os.path.getsize(self.ARCHIVO)
+
+            # Las operaciones del diario son idempotentes, así que se reaplican
+            # en orden: diario del .bak (por si el snapshot vino del respaldo),
+            # diario rotado de una compactación interrumpida y diario actual
+            self._reproducir_diario(self.ARCHIVO_DIARIO + ".bak")
+            pendiente = os.path.exists(self.ARCHIVO_DIARIO + ".1")
+            recuperadas = self._reproducir_diario(self.ARCHIVO_DIARIO + ".1")
+            recuperadas += self._reproducir_diario(self.ARCHIVO_DIARIO)
+
+            if pendiente:
+                # Se completa la compactación que quedó a medias. El snapshot
+                # incluye también el diario actual: se añade al rotado para que
+                # .bak + .log.bak sigan reconstruyendo el mismo estado
+                if self.guardar_en_archivo():
+                    self._anadir_al_rotado()
+                    os.replace(self.ARCHIVO_DIARIO + ".1", self.ARCHIVO_DIARIO + ".bak")
+                    open(self.ARCHIVO_DIARIO, "w").close()
 
             if self.productos:
                 print("📂 Inventario cargado correctamente desde archivo.")
+                if recuperadas:
+                    print(f"🔁 {recuperadas} cambios recuperados del diario.")
             else:
                 print("📭 Inventario vacío al iniciar el programa.")
 
-        except json.JSONDecodeError:
-            print("⚠ Archivo corrupto. Se inicializa inventario vacío.")
-            self.productos = {}
         except PermissionError:
             print("❌ Error: no se tienen permisos para leer el archivo.")
+            return
+
+        try:
+            self._abrir_diario()
+        except PermissionError:
+            print("❌ Error: no se tienen permisos para abrir el diario de cambios.")
 
     # ----------------------------
     # Operaciones de inventario
     # ----------------------------
+    @_esperar_diario
     def agregar_producto(self, producto):
-        if producto.id in self.productos:
-            return False
-        self.productos[producto.id] = producto
-        self.guardar_en_archivo()
+        with self._bloqueo_estructura, self._franja(producto.id):
+            if producto.id in self.productos:
+                return False
+            self.productos[producto.id] = producto
+            self._registrar({"op": "agregar", "producto": producto.to_dict()})
         return True
 
+    @_esperar_diario
+    def agregar_lote(self, productos):
+        """Añade varios productos con un único registro (y un único fsync) en el diario.
+
+        Devuelve los IDs rechazados por repetidos.
+        """
+        aceptados, rechazados = [], []
+        with ExitStack() as pila:
+            pila.enter_context(self._bloqueo_estructura)
+            for franja in self._franjas:
+                pila.enter_context(franja)
+            for producto in productos:
+                if producto.id in self.productos:
+                    rechazados.append(producto.id)
+                    continue
+                self.productos[producto.id] = producto
+                aceptados.append(producto.to_dict())
+            if aceptados:
+                self._registrar({"op": "lote", "productos": aceptados})
+        return rechazados
+
+    @_esperar_diario
     def eliminar_producto(self, id):
-        if id in self.productos:
-            del self.productos[id]
-            self.guardar_en_archivo()
-            return True
+        with self._bloqueo_estructura, self._franja(id):
+            if id in self.productos:
+                del self.productos[id]
+                self._registrar({"op": "eliminar", "id": id})
+                return True
         return False
 
+    @_esperar_diario
     def actualizar_cantidad(self, id, cantidad):
-        if id in self.productos:
-            self.productos[id].cantidad = cantidad
-            self.guardar_en_archivo()
-            return True
+        with self._franja(id):
+            if id in self.productos:
+                self.productos[id].cantidad = cantidad
+                self._registrar({"op": "cantidad", "id": id, "valor": cantidad})
+                return True
         return False
 
-    def actualizar_precio(self, id, precio):
-        if id in self.productos:
-            self.productos[id].precio = precio
-            self.guardar_en_archivo()
+    @_esperar_diario
+    def ajustar_cantidad(self, id, delta):
+        """Suma delta a la cantidad de forma atómica; se rechaza si quedaría negativa."""
+        with self._franja(id):
+            producto = self.productos.get(id)
+            if producto is None or producto.cantidad + delta < 0:
+                return False
+            producto.cantidad += delta
+            self._registrar({"op": "cantidad", "id": id, "valor": producto.cantidad})
             return True
+
+    @_esperar_diario
+    def actualizar_precio(self, id, precio):
+        with self._franja(id):
+            if id in self.productos:
+                self.productos[id].precio = precio
+                self._registrar({"op": "precio", "id": id, "valor": precio})
+                return True
         return False
 
     def buscar_producto(self, nombre):
@@ -112,6 +437,25 @@ class Inventario:
     def mostrar_productos(self):
         return list(self.productos.values())
 
+    # ----------------------------
+    # Importación y exportación masiva
+    # ----------------------------
+    def importar(self, ruta, tam_lote=5000, progreso=None):
+        """Importa productos de un CSV, JSON Lines o JSON por lotes.
+
+        Cada registro se valida con las reglas de Semana 11 y cada lote entra
+        con agregar_lote: un único registro (y un fsync) en el diario por lote.
+        Devuelve un InformeCarga con lo que no se pudo cargar.
+        """
+        informe = InformeCarga(origen=ruta)
+        cargar_por_lotes(leer_registros(ruta), lambda registro: Producto(*validar_registro(registro)),
+                         self.productos.__contains__, self.agregar_lote, informe, tam_lote, progreso)
+        return informe
+
+    def exportar(self, ruta):
+        """Exporta los productos a CSV, JSON Lines o JSON; devuelve cuántos se escribieron."""
+        return exportar_registros(ruta, (p.to_dict() for p in self.mostrar_productos()))
+
 
 # ----------------------------
 # Interfaz de usuario en consola
@@ -197,6 +541,7 @@ def menu():
                 print("📭 Inventario vacío.")
 
         elif opcion == "7":
+            inventario.cerrar()
             print("👋 Saliendo del sistema... Hasta pronto!")
             break
 
@@ -0,0 +1,79 @@
+# ==============================
+# PRUEBA DE ESTRÉS: INVENTARIO CON VARIOS HILOS (CAJAS)
+# ==============================
+# Cada hilo simula una caja que ajusta cantidades de productos al azar.
+# Al final se comprueba que no se perdió ninguna actualización, tanto en
+# memoria como tras recargar el inventario desde el diario.
+#
+# No se espera un escalado lineal: el GIL de CPython ejecuta el código Python
+# de un solo hilo a la vez y cada ajuste es trabajo de CPU (JSON + diccionario).
+# Los bloqueos por franjas evitan que los hilos se pisen y el escritor único
+# agrupa los fsync; con más hilos el rendimiento se mantiene, no se multiplica.
+#
+# Uso: python benchmark_concurrencia.py [operaciones_por_hilo]
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from Sistema_de_gestion_de_inventarios_mejorado import Inventario, Producto
+
+PRODUCTOS = 1000
+STOCK_INICIAL = 1_000_000
+
+
+def prueba(hilos, operaciones):
+    directorio = tempfile.mkdtemp()
+    Inventario.ARCHIVO = os.path.join(directorio, "inventario.JSON")
+    Inventario.ARCHIVO_DIARIO = Inventario.ARCHIVO + ".log"
+
+    inventario = Inventario(politica_fsync="lote", concurrente=True)
+    inventario.agregar_lote([Producto(str(i), f"Producto {i}", STOCK_INICIAL, 1.0) for i in range(PRODUCTOS)])
+    esperado = [0] * PRODUCTOS
+    bloqueo_esperado = threading.Lock()
+
+    def caja(semilla):
+        rnd = random.Random(semilla)
+        local = [0] * PRODUCTOS
+        for _ in range(operaciones):
+            i = rnd.randrange(PRODUCTOS)
+            delta = rnd.choice((-3, -2, -1, 1, 2))
+            if inventario.ajustar_cantidad(str(i), delta):
+                local[i] += delta
+        with bloqueo_esperado:
+            for i, d in enumerate(local):
+                esperado[i] += d
+
+    trabajadores = [threading.Thread(target=caja, args=(n,)) for n in range(hilos)]
+    inicio = time.perf_counter()
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    segundos = time.perf_counter() - inicio
+    inventario.cerrar()
+
+    en_memoria = all(inventario.productos[str(i)].cantidad == STOCK_INICIAL + esperado[i] for i in range(PRODUCTOS))
+    recargado = Inventario()
+    en_disco = all(recargado.productos[str(i)].cantidad == STOCK_INICIAL + esperado[i] for i in range(PRODUCTOS))
+    recargado.cerrar()
+    return hilos * operaciones / segundos, en_memoria and en_disco
+
+
+def main():
+    operaciones = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    print(f"{'Hilos':>5} {'ops/s':>12} {'Escalado':>9}  Sin pérdidas")
+    print("-" * 42)
+    base = None
+    for hilos in (1, 2, 4, 8):
+        ops, correcto = prueba(hilos, operaciones)
+        base = base or ops
+        print(f"{hilos:>5} {ops:>12,.0f} {ops / base:>8.2f}x  {'✅' if correcto else '❌'}")
+    print("Escalado ~1x esperado: el GIL serializa el trabajo de CPU de los hilos.")
+
+
+if __name__ == "__main__":
+    main()
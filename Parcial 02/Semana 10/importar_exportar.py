@@ -0,0 +1,56 @@
+# ==============================
+# IMPORTACIÓN Y EXPORTACIÓN MASIVA DEL INVENTARIO
+# ==============================
+# Uso:
+#   python importar_exportar.py importar productos.csv [--lote 5000]
+#   python importar_exportar.py exportar respaldo.jsonl
+#
+# Trabaja sobre inventario.JSON y su diario de cambios: cada lote importado
+# se añade al diario como un único registro, sin reescribir el inventario
+# completo. Si la importación se interrumpe, los lotes ya confirmados quedan
+# guardados.
+
+import argparse
+import sys
+import time
+
+from Sistema_de_gestion_de_inventarios_mejorado import Inventario
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa o exporta productos del inventario.")
+    parser.add_argument("accion", choices=["importar", "exportar"])
+    parser.add_argument("archivo", help="archivo .csv, .jsonl o .json")
+    parser.add_argument("--lote", type=int, default=5000, help="productos por lote")
+    args = parser.parse_args()
+
+    inventario = Inventario()
+    inicio = time.perf_counter()
+    try:
+        if args.accion == "exportar":
+            total = inventario.exportar(args.archivo)
+            print(f"✅ {total} productos exportados a {args.archivo}")
+            return 0
+        informe = inventario.importar(
+            args.archivo, tam_lote=args.lote,
+            progreso=lambda n: print(f"\rImportando... {n} registros", end="", flush=True))
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    finally:
+        inventario.cerrar()
+
+    segundos = time.perf_counter() - inicio
+    print(f"\r✅ {informe.cargados} productos importados en {segundos:.2f} s "
+          f"({informe.cargados / segundos if segundos else 0:,.0f} filas/s)")
+    if informe.duplicados:
+        print(f"⚠ {len(informe.duplicados)} IDs duplicados ignorados")
+    for posicion, motivo in informe.invalidos[:20]:
+        print(f"⚠ Registro {posicion} inválido: {motivo}")
+    if len(informe.invalidos) > 20:
+        print(f"⚠ ... y {len(informe.invalidos) - 20} registros inválidos más")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
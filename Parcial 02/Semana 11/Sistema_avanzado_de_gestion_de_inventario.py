@@ -1,18 +1,54 @@
 # Tema: Sistema Avanzado de Gestión de Inventario
 
-from dataclasses import dataclass
+from array import array
+import bisect
+from dataclasses import dataclass, field
 from collections import defaultdict
-from typing import Dict, List, Set
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 import json
+import operator
 import os
+import sqlite3
+import sys
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: los reportes usan Python puro
+    np = None
+
+# Persistencia compartida de Parcial 02 (carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from persistencia import (InformeCarga, cargar_por_lotes, exportar_registros, iterar_json,
+                          leer_jsonl, leer_registros, lineas_jsonl, validar_cantidad,
+                          validar_nombre, validar_precio, validar_registro)
+
+# Una página de un listado. siguiente es el cursor para pedir la próxima
+# página (None si es la última); sigue siendo válido aunque el inventario
+# cambie entre una página y otra.
+@dataclass
+class Pagina:
+    elementos: List[Any]
+    siguiente: Optional[str] = None
+
+
+# Órdenes de listado: por ID o por nombre (desempatado por ID)
+ORDENES = ("id", "nombre")
+
+# Diario de lotes de una importación en curso, junto al archivo del inventario
+SUFIJO_IMPORTACION = ".importando.jsonl"
+
 
 # Clase Producto: representa un producto del inventario
-@dataclass
+@dataclass(slots=True)
 class Producto:
     _id: str
     _nombre: str
     _cantidad: int
     _precio: float
+    # Inventario dueño, avisado de los cambios de campo con
+    # _al_cambiar_producto(producto, campo, anterior, nuevo). Un producto solo
+    # pertenece a un inventario: basta una referencia, sin lista por producto.
+    _dueno: Any = field(default=None, repr=False, compare=False)
 
     @property
     def id(self) -> str:
@@ -24,9 +60,9 @@ class Producto:
 
     @nombre.setter
     def nombre(self, value: str) -> None:
-        if not value.strip():
-            raise ValueError("El nombre no puede estar vacío.")
-        self._nombre = value.strip()
+        anterior = self._nombre
+        self._nombre = validar_nombre(value)
+        self._notificar("nombre", anterior, self._nombre)
 
     @property
     def cantidad(self) -> int:
@@ -34,9 +70,9 @@ class Producto:
 
     @cantidad.setter
     def cantidad(self, value: int) -> None:
-        if value < 0:
-            raise ValueError("La cantidad debe ser >= 0.")
-        self._cantidad = value
+        anterior = self._cantidad
+        self._cantidad = validar_cantidad(value)
+        self._notificar("cantidad", anterior, self._cantidad)
 
     @property
     def precio(self) -> float:
@@ -44,9 +80,22 @@ class Producto:
 
     @precio.setter
     def precio(self, value: float) -> None:
-        if value < 0:
-            raise ValueError("El precio debe ser >= 0.")
-        self._precio = round(value, 2)
+        anterior = self._precio
+        self._precio = validar_precio(value)
+        self._notificar("precio", anterior, self._precio)
+
+    # Eventos de cambio: permiten a los índices derivados actualizarse en O(1)
+    def vincular(self, dueno: Any) -> None:
+        if self._dueno is not None and self._dueno is not dueno:
+            raise ValueError(f"El producto '{self._id}' ya pertenece a otro inventario.")
+        self._dueno = dueno
+
+    def desvincular(self) -> None:
+        self._dueno = None
+
+    def _notificar(self, campo: str, anterior: Any, nuevo: Any) -> None:
+        if anterior != nuevo and self._dueno is not None:
+            self._dueno._al_cambiar_producto(self, campo, anterior, nuevo)
 
     def to_dict(self) -> Dict:
         return {"id": self.id, "nombre": self.nombre, "cantidad": self.cantidad, "precio": self.precio}
@@ -55,27 +104,113 @@ class Producto:
     def from_dict(data: Dict) -> "Producto":
         return Producto(data["id"], data["nombre"], data["cantidad"], data["precio"])
 
+    # Igual que from_dict, pero aplicando las reglas de los setters
+    @staticmethod
+    def desde_registro(data: Dict) -> "Producto":
+        return Producto(*validar_registro(data))
+
+# Índice invertido de trigramas: búsqueda por subcadena sin recorrer todos los nombres
+class IndiceTrigramas:
+    def __init__(self) -> None:
+        self._claves: Set[str] = set()
+        self._por_trigrama: defaultdict[str, Set[str]] = defaultdict(set)
+
+    @staticmethod
+    def trigramas(texto: str) -> Set[str]:
+        return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+    def agregar(self, clave: str) -> None:
+        if clave in self._claves:
+            return
+        self._claves.add(clave)
+        for t in self.trigramas(clave):
+            self._por_trigrama[t].add(clave)
+
+    def quitar(self, clave: str) -> None:
+        if clave not in self._claves:
+            return
+        self._claves.remove(clave)
+        for t in self.trigramas(clave):
+            claves = self._por_trigrama[t]
+            claves.discard(clave)
+            if not claves:
+                del self._por_trigrama[t]
+
+    # Devuelve las claves que contienen la subcadena (ya en minúsculas)
+    def buscar(self, subcadena: str) -> Iterable[str]:
+        if len(subcadena) < 3:
+            # Sin trigramas que intersecar: se revisan todas las claves
+            return [c for c in self._claves if subcadena in c]
+        conjuntos = sorted((self._por_trigrama.get(t, set()) for t in self.trigramas(subcadena)), key=len)
+        candidatas = conjuntos[0].intersection(*conjuntos[1:])
+        # Los trigramas pueden coincidir fuera de orden: se verifica cada candidata
+        return [c for c in candidatas if subcadena in c]
+
+
 # Clase Inventario: gestiona los productos usando un diccionario
 class Inventario:
     def __init__(self) -> None:
         self._productos: Dict[str, Producto] = {}
         self._indice_nombre: defaultdict[str, Set[str]] = defaultdict(set)  # búsqueda rápida por nombre
+        self._indice_trigramas = IndiceTrigramas()  # búsqueda por subcadena
+        self._ordenes: Dict[str, List[str]] = {}  # claves ordenadas para paginar, creadas al primer uso
+
+    # Mantener los índices de nombre (y las claves de orden, que dependen de él)
+    def _indexar_nombre(self, pid: str, nombre: str) -> None:
+        clave = nombre.lower()
+        self._indice_nombre[clave].add(pid)
+        self._indice_trigramas.agregar(clave)
+        for orden, claves in self._ordenes.items():
+            bisect.insort(claves, self._clave_orden(orden, pid, clave))
+
+    def _desindexar_nombre(self, pid: str, nombre: str) -> None:
+        clave = nombre.lower()
+        self._indice_nombre[clave].discard(pid)
+        if not self._indice_nombre[clave]:
+            del self._indice_nombre[clave]
+            self._indice_trigramas.quitar(clave)
+        for orden, claves in self._ordenes.items():
+            i = bisect.bisect_left(claves, self._clave_orden(orden, pid, clave))
+            del claves[i]
+
+    # Clave de orden de un producto; el cursor de una página es la última clave.
+    # "\0" separa nombre e ID y ordena antes que cualquier otro carácter.
+    @staticmethod
+    def _clave_orden(orden: str, pid: str, nombre_min: str) -> str:
+        return pid if orden == "id" else nombre_min + "\0" + pid
+
+    def _claves_orden(self, orden: str) -> List[str]:
+        if orden not in ORDENES:
+            raise ValueError(f"Orden desconocido: {orden}. Use uno de {', '.join(ORDENES)}.")
+        claves = self._ordenes.get(orden)
+        if claves is None:
+            # Se ordena una vez; después se mantiene al añadir, renombrar o eliminar
+            claves = sorted(self._clave_orden(orden, pid, nombre)
+                            for nombre, pids in self._indice_nombre.items() for pid in pids)
+            self._ordenes[orden] = claves
+        return claves
+
+    # Reacciona a los cambios publicados por los productos del inventario
+    def _al_cambiar_producto(self, producto: Producto, campo: str, anterior: Any, nuevo: Any) -> None:
+        if campo == "nombre":
+            self._desindexar_nombre(producto.id, anterior)
+            self._indexar_nombre(producto.id, nuevo)
 
     # Añadir nuevo producto
     def anadir_producto(self, producto: Producto) -> None:
         if producto.id in self._productos:
             raise KeyError(f"ID '{producto.id}' ya existe.")
+        producto.vincular(self)
         self._productos[producto.id] = producto
-        self._indice_nombre[producto.nombre.lower()].add(producto.id)
+        self._indexar_nombre(producto.id, producto.nombre)
 
     # Eliminar producto por ID
     def eliminar_producto(self, pid: str) -> None:
         if pid not in self._productos:
             raise KeyError(f"No existe el producto con ID '{pid}'.")
         prod = self._productos.pop(pid)
-        self._indice_nombre[prod.nombre.lower()].remove(pid)
-        if not self._indice_nombre[prod.nombre.lower()]:
-            del self._indice_nombre[prod.nombre.lower()]
+        prod.desvincular()
+        self._desindexar_nombre(pid, prod.nombre)
 
     # Actualizar cantidad
     def actualizar_cantidad(self, pid: str, cantidad: int) -> None:
@@ -87,31 +222,469 @@ class Inventario:
 
     # Buscar productos por nombre
     def buscar_por_nombre(self, nombre: str) -> List[Producto]:
-        nombre = nombre.lower()
         ids = set()
-        for clave, pid_set in self._indice_nombre.items():
-            if nombre in clave:
-                ids |= pid_set
-        return [self._productos[pid] for pid in ids]
+        for clave in self._indice_trigramas.buscar(nombre.lower()):
+            ids |= self._indice_nombre[clave]
+        return [self._obtener(pid) for pid in ids]
 
     # Mostrar todos los productos
     def mostrar_todos(self) -> List[Producto]:
         return list(self._productos.values())
 
-    # Guardar inventario en archivo
+    # Una página del listado ordenado, a partir del cursor de la anterior
+    def pagina(self, orden: str = "id", cursor: Optional[str] = None, tam_pagina: int = 20) -> Pagina:
+        claves = self._claves_orden(orden)
+        inicio = bisect.bisect_right(claves, cursor) if cursor is not None else 0
+        trozo = claves[inicio:inicio + tam_pagina]
+        elementos = [self._obtener(clave.rpartition("\0")[2]) for clave in trozo]
+        return Pagina(elementos, trozo[-1] if inicio + tam_pagina < len(claves) else None)
+
+    # Recorre todo el inventario ordenado, página a página, sin copiarlo entero
+    def iterar_ordenado(self, orden: str = "id", tam_pagina: int = 500) -> Iterator[Producto]:
+        pagina = self.pagina(orden, None, tam_pagina)
+        while True:
+            yield from pagina.elementos
+            if pagina.siguiente is None:
+                return
+            pagina = self.pagina(orden, pagina.siguiente, tam_pagina)
+
+    def _obtener(self, pid: str) -> Producto:
+        return self._productos[pid]
+
+    # Columnas (ids, cantidades, precios) para los reportes
+    def _columnas(self) -> Tuple[List[str], array, array]:
+        productos = self._productos.values()
+        return (list(self._productos),
+                array("q", [p._cantidad for p in productos]),
+                array("d", [p._precio for p in productos]))
+
+    # Reportes: una sola pasada sobre las columnas de cantidad y precio
+    def valor_total(self) -> float:
+        _, cantidades, precios = self._columnas()
+        if np is not None and len(cantidades):
+            return float(np.dot(np.frombuffer(cantidades, dtype=np.int64), np.frombuffer(precios, dtype=np.float64)))
+        return sum(map(operator.mul, cantidades, precios))
+
+    def productos_bajo_stock(self, umbral: int) -> List[Producto]:
+        ids, cantidades, _ = self._columnas()
+        if np is not None and len(cantidades):
+            filas = np.flatnonzero(np.frombuffer(cantidades, dtype=np.int64) < umbral).tolist()
+        else:
+            filas = [i for i, c in enumerate(cantidades) if c < umbral]
+        return [self._obtener(ids[i]) for i in filas]
+
+    # Histograma de precios en bandas de igual ancho: [(desde, hasta, productos)]
+    def histograma_precios(self, bandas: int = 5) -> List[Tuple[float, float, int]]:
+        if bandas < 1:
+            raise ValueError("El número de bandas debe ser >= 1.")
+        _, _, precios = self._columnas()
+        if not precios:
+            return []
+        if np is not None:
+            conteos, limites = np.histogram(np.frombuffer(precios, dtype=np.float64), bins=bandas)
+            return [(float(limites[i]), float(limites[i + 1]), int(conteos[i])) for i in range(bandas)]
+        minimo, maximo = min(precios), max(precios)
+        ancho = (maximo - minimo) / bandas or 1.0
+        conteos = [0] * bandas
+        for precio in precios:
+            conteos[min(int((precio - minimo) / ancho), bandas - 1)] += 1
+        return [(minimo + i * ancho, minimo + (i + 1) * ancho, conteos[i]) for i in range(bandas)]
+
+    # Guardar inventario en archivo (un producto por línea, sin armar el
+    # documento completo en memoria)
     def guardar_en_archivo(self, ruta: str) -> None:
-        with open(ruta, "w", encoding="utf-8") as f:
-            json.dump([p.to_dict() for p in self._productos.values()], f, indent=2, ensure_ascii=False)
+        exportar_registros(ruta, (p.to_dict() for p in self.mostrar_todos()))
+
+    # Añadir varios productos ya validados (IDs únicos y no presentes)
+    def anadir_lote(self, productos: List[Producto]) -> None:
+        # Con muchas altas sale más barato volver a ordenar al paginar
+        self._ordenes.clear()
+        for producto in productos:
+            self.anadir_producto(producto)
+
+    # Cargar inventario desde archivo, por lotes y sin abortar ante registros
+    # duplicados o inválidos. Si el archivo está dañado se usa su copia .bak.
+    # Si quedó el diario de una importación interrumpida, sus lotes se
+    # reproducen encima y se compactan en el archivo.
+    def cargar_desde_archivo(self, ruta: str, tam_lote: int = 1000,
+                             progreso: Optional[Callable[[int], None]] = None) -> InformeCarga:
+        informe = InformeCarga()
+        for candidato in (ruta, ruta + ".bak"):
+            if not os.path.exists(candidato):
+                continue
+            informe = InformeCarga(origen=candidato)
+            cargados: List[str] = []
+            try:
+                with open(candidato, "r", encoding="utf-8") as f:
+                    cargar_por_lotes(enumerate(iterar_json(f), 1), Producto.desde_registro,
+                                     self._existe, self.anadir_lote, informe, tam_lote, progreso,
+                                     al_confirmar=lambda lote: cargados.extend(p.id for p in lote))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"⚠ Archivo corrupto: {candidato} ({e})")
+                # Se descarta lo cargado a medias antes de probar con la copia
+                for pid in cargados:
+                    self.eliminar_producto(pid)
+                informe = InformeCarga()
+                continue
+            if candidato != ruta:
+                print(f"🩹 Recuperado desde la última copia válida: {candidato}")
+            break
+
+        diario = ruta + SUFIJO_IMPORTACION
+        if os.path.exists(diario):
+            recuperado = InformeCarga(origen=diario)
+            with open(diario, "r", encoding="utf-8") as f:
+                cargar_por_lotes(leer_jsonl(f), Producto.desde_registro, self._existe,
+                                 self.anadir_lote, recuperado, tam_lote, progreso)
+            print(f"🩹 Importación interrumpida: {recuperado.cargados} productos recuperados de {diario}")
+            informe.cargados += recuperado.cargados
+            informe.origen = informe.origen or diario
+            self._completar_importacion(ruta)
+        return informe
+
+    # Importación masiva desde CSV, JSON Lines o JSON. al_confirmar(lote) se
+    # llama una vez por lote (p. ej. para persistirlo), después de insertarlo.
+    def importar(self, ruta: str, tam_lote: int = 5000,
+                 progreso: Optional[Callable[[int], None]] = None,
+                 al_confirmar: Optional[Callable[[List[Producto]], None]] = None) -> InformeCarga:
+        informe = InformeCarga(origen=ruta)
+        cargar_por_lotes(leer_registros(ruta), Producto.desde_registro, self._existe,
+                         self.anadir_lote, informe, tam_lote, progreso, al_confirmar)
+        return informe
+
+    # Importación que persiste cada lote sin reescribir el inventario completo:
+    # los lotes se añaden al diario <archivo>.importando.jsonl (un fsync por
+    # lote, coste O(lote)) y el archivo se escribe una sola vez al terminar.
+    # Si el proceso muere a mitad, cargar_desde_archivo reproduce el diario.
+    def importar_con_diario(self, ruta: str, archivo: str, tam_lote: int = 5000,
+                            progreso: Optional[Callable[[int], None]] = None) -> InformeCarga:
+        with open(archivo + SUFIJO_IMPORTACION, "a", encoding="utf-8") as diario:
+            def anotar(lote: List[Producto]) -> None:
+                diario.write(lineas_jsonl(p.to_dict() for p in lote))
+                diario.flush()
+                os.fsync(diario.fileno())
+
+            try:
+                return self.importar(ruta, tam_lote, progreso, anotar)
+            finally:
+                # También si la importación falla a mitad: los lotes
+                # confirmados ya están en memoria y en el diario
+                diario.close()
+                self._completar_importacion(archivo)
+
+    def _completar_importacion(self, archivo: str) -> None:
+        self.guardar_en_archivo(archivo)
+        os.remove(archivo + SUFIJO_IMPORTACION)
+
+    # Exportación a CSV, JSON Lines o JSON; devuelve cuántos productos se escribieron
+    def exportar(self, ruta: str) -> int:
+        return exportar_registros(ruta, (p.to_dict() for p in self.mostrar_todos()))
+
+    def _existe(self, pid: str) -> bool:
+        return pid in self._productos
+
+# Vista ligera de una fila de InventarioColumnar: misma interfaz que Producto
+class ProductoVista:
+    __slots__ = ("_inventario", "_id")
+
+    def __init__(self, inventario: "InventarioColumnar", pid: str) -> None:
+        self._inventario = inventario
+        self._id = pid
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def nombre(self) -> str:
+        return self._inventario._nombres[self._inventario._filas[self._id]]
+
+    @nombre.setter
+    def nombre(self, value: str) -> None:
+        self._inventario._renombrar(self._id, validar_nombre(value))
+
+    @property
+    def cantidad(self) -> int:
+        return self._inventario._cantidades[self._inventario._filas[self._id]]
+
+    @cantidad.setter
+    def cantidad(self, value: int) -> None:
+        self._inventario.actualizar_cantidad(self._id, value)
+
+    @property
+    def precio(self) -> float:
+        return self._inventario._precios[self._inventario._filas[self._id]]
+
+    @precio.setter
+    def precio(self, value: float) -> None:
+        self._inventario.actualizar_precio(self._id, value)
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "nombre": self.nombre, "cantidad": self.cantidad, "precio": self.precio}
+
+    def __repr__(self) -> str:
+        return f"ProductoVista(id={self.id!r}, nombre={self.nombre!r}, cantidad={self.cantidad}, precio={self.precio})"
+
+
+# Inventario columnar: cada campo en su propia columna compacta en lugar de un
+# objeto por producto. Misma interfaz pública que Inventario.
+class InventarioColumnar(Inventario):
+    def __init__(self) -> None:
+        super().__init__()
+        self._filas: Dict[str, int] = {}   # id -> fila
+        self._ids: List[str] = []
+        self._nombres: List[str] = []      # cadenas internadas: nombres repetidos no ocupan memoria extra
+        self._cantidades = array("q")
+        self._precios = array("d")
+
+    def anadir_producto(self, producto: Producto) -> None:
+        if producto.id in self._filas:
+            raise KeyError(f"ID '{producto.id}' ya existe.")
+        pid = sys.intern(producto.id)
+        nombre = sys.intern(validar_nombre(producto.nombre))
+        cantidad = validar_cantidad(producto.cantidad)
+        precio = validar_precio(producto.precio)
+        self._filas[pid] = len(self._ids)
+        self._ids.append(pid)
+        self._nombres.append(nombre)
+        self._cantidades.append(cantidad)
+        self._precios.append(precio)
+        self._indexar_nombre(pid, nombre)
+
+    # Se mueve la última fila al hueco para no desplazar las columnas
+    def eliminar_producto(self, pid: str) -> None:
+        if pid not in self._filas:
+            raise KeyError(f"No existe el producto con ID '{pid}'.")
+        fila = self._filas.pop(pid)
+        self._desindexar_nombre(pid, self._nombres[fila])
+        ultima = len(self._ids) - 1
+        if fila != ultima:
+            movido = self._ids[ultima]
+            self._ids[fila] = movido
+            self._nombres[fila] = self._nombres[ultima]
+            self._cantidades[fila] = self._cantidades[ultima]
+            self._precios[fila] = self._precios[ultima]
+            self._filas[movido] = fila
+        self._ids.pop()
+        self._nombres.pop()
+        self._cantidades.pop()
+        self._precios.pop()
+
+    def actualizar_cantidad(self, pid: str, cantidad: int) -> None:
+        self._cantidades[self._filas[pid]] = validar_cantidad(cantidad)
+
+    def actualizar_precio(self, pid: str, precio: float) -> None:
+        self._precios[self._filas[pid]] = validar_precio(precio)
+
+    def _existe(self, pid: str) -> bool:
+        return pid in self._filas
+
+    def _obtener(self, pid: str) -> ProductoVista:
+        return ProductoVista(self, pid)
+
+    # Las columnas ya existen: los reportes las usan sin copiarlas
+    def _columnas(self) -> Tuple[List[str], array, array]:
+        return self._ids, self._cantidades, self._precios
+
+    def _renombrar(self, pid: str, nombre: str) -> None:
+        fila = self._filas[pid]
+        self._desindexar_nombre(pid, self._nombres[fila])
+        self._nombres[fila] = sys.intern(nombre)
+        self._indexar_nombre(pid, nombre)
+
+    def mostrar_todos(self) -> List[ProductoVista]:
+        return [ProductoVista(self, pid) for pid in self._ids]
+
+
+# Inventario sobre SQLite: los datos viven en disco, no en memoria.
+# Las actualizaciones son puntuales (O(log n)) en vez de reescribir el archivo.
+class InventarioSQLite(Inventario):
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS productos (
+            id TEXT PRIMARY KEY,
+            nombre TEXT NOT NULL,
+            nombre_min TEXT NOT NULL,
+            cantidad INTEGER NOT NULL CHECK (cantidad >= 0),
+            precio REAL NOT NULL CHECK (precio >= 0)
+        );
+        CREATE INDEX IF NOT EXISTS idx_productos_nombre_id ON productos (nombre_min, id);
+        CREATE INDEX IF NOT EXISTS idx_productos_cantidad ON productos (cantidad);
+    """
+    # Cambios sobre bases creadas por versiones anteriores; se aplican una sola
+    # vez y PRAGMA user_version recuerda cuántas lleva aplicadas la base
+    MIGRACIONES = [
+        "DROP INDEX IF EXISTS idx_productos_nombre",  # 1: reemplazado por idx_productos_nombre_id
+    ]
+    # Índice de trigramas de FTS5 (si la versión de SQLite lo incluye)
+    ESQUEMA_TRIGRAMAS = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+            nombre_min, content='productos', content_rowid='rowid', tokenize='trigram');
+        CREATE TRIGGER IF NOT EXISTS productos_ai AFTER INSERT ON productos BEGIN
+            INSERT INTO productos_fts (rowid, nombre_min) VALUES (new.rowid, new.nombre_min);
+        END;
+        CREATE TRIGGER IF NOT EXISTS productos_ad AFTER DELETE ON productos BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, nombre_min) VALUES ('delete', old.rowid, old.nombre_min);
+        END;
+        CREATE TRIGGER IF NOT EXISTS productos_au AFTER UPDATE OF nombre_min ON productos BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, nombre_min) VALUES ('delete', old.rowid, old.nombre_min);
+            INSERT INTO productos_fts (rowid, nombre_min) VALUES (new.rowid, new.nombre_min);
+        END;
+    """
+    # Sentencias fijas con parámetros: sqlite3 las prepara una vez y las reutiliza
+    SQL_INSERTAR = "INSERT INTO productos (id, nombre, nombre_min, cantidad, precio) VALUES (?, ?, ?, ?, ?)"
+    SQL_SELECCION = "SELECT id, nombre, cantidad, precio FROM productos"
+    SQL_ACTUALIZAR = {
+        "nombre": "UPDATE productos SET nombre = ?, nombre_min = ? WHERE id = ?",
+        "cantidad": "UPDATE productos SET cantidad = ? WHERE id = ?",
+        "precio": "UPDATE productos SET precio = ? WHERE id = ?",
+    }
+
+    def __init__(self, ruta: str = "inventario.db") -> None:
+        super().__init__()
+        self._con = sqlite3.connect(ruta, cached_statements=64)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        with self._con:
+            self._con.executescript(self.ESQUEMA)
+            self._migrar()
+            try:
+                self._con.executescript(self.ESQUEMA_TRIGRAMAS)
+                self._trigramas = True
+            except sqlite3.OperationalError:
+                self._trigramas = False
+
+    def _migrar(self) -> None:
+        version = self._con.execute("PRAGMA user_version").fetchone()[0]
+        for numero, sql in enumerate(self.MIGRACIONES[version:], version + 1):
+            self._con.execute(sql)
+            self._con.execute(f"PRAGMA user_version = {numero}")
+
+    def cerrar(self) -> None:
+        self._con.close()
+
+    # Al migrar un JSON con una importación a medias, sus lotes se copian a la
+    # base pero el JSON y su diario quedan como estaban
+    def _completar_importacion(self, archivo: str) -> None:
+        pass
+
+    def _fila_a_producto(self, fila: Tuple) -> Producto:
+        # Los cambios hechos sobre el producto devuelto se escriben en la base
+        producto = Producto(*fila)
+        producto.vincular(self)
+        return producto
+
+    def _al_cambiar_producto(self, producto: Producto, campo: str, anterior: Any, nuevo: Any) -> None:
+        parametros = (nuevo, nuevo.lower(), producto.id) if campo == "nombre" else (nuevo, producto.id)
+        with self._con:
+            self._con.execute(self.SQL_ACTUALIZAR[campo], parametros)
+
+    @staticmethod
+    def _parametros(producto: Producto) -> Tuple:
+        nombre = validar_nombre(producto.nombre)
+        return (producto.id, nombre, nombre.lower(),
+                validar_cantidad(producto.cantidad), validar_precio(producto.precio))
+
+    def anadir_producto(self, producto: Producto) -> None:
+        try:
+            with self._con:
+                self._con.execute(self.SQL_INSERTAR, self._parametros(producto))
+        except sqlite3.IntegrityError:
+            raise KeyError(f"ID '{producto.id}' ya existe.") from None
+
+    # Un lote completo se inserta en una sola transacción
+    def anadir_lote(self, productos: List[Producto]) -> None:
+        try:
+            with self._con:
+                self._con.executemany(self.SQL_INSERTAR, map(self._parametros, productos))
+        except sqlite3.IntegrityError as e:
+            raise KeyError(f"ID repetido en el lote: {e}") from None
+
+    def eliminar_producto(self, pid: str) -> None:
+        with self._con:
+            if self._con.execute("DELETE FROM productos WHERE id = ?", (pid,)).rowcount == 0:
+                raise KeyError(f"No existe el producto con ID '{pid}'.")
+
+    def _actualizar(self, campo: str, pid: str, valor: Any) -> None:
+        with self._con:
+            if self._con.execute(self.SQL_ACTUALIZAR[campo], (valor, pid)).rowcount == 0:
+                raise KeyError(pid)
+
+    def actualizar_cantidad(self, pid: str, cantidad: int) -> None:
+        self._actualizar("cantidad", pid, validar_cantidad(cantidad))
+
+    def actualizar_precio(self, pid: str, precio: float) -> None:
+        self._actualizar("precio", pid, validar_precio(precio))
+
+    def buscar_por_nombre(self, nombre: str) -> List[Producto]:
+        nombre = nombre.lower()
+        if self._trigramas and len(nombre) >= 3:
+            consulta = '"' + nombre.replace('"', '""') + '"'
+            filas = self._con.execute(
+                self.SQL_SELECCION + " WHERE rowid IN (SELECT rowid FROM productos_fts WHERE productos_fts MATCH ?)"
+                " AND instr(nombre_min, ?) > 0", (consulta, nombre))
+        else:
+            filas = self._con.execute(self.SQL_SELECCION + " WHERE instr(nombre_min, ?) > 0", (nombre,))
+        return [self._fila_a_producto(f) for f in filas]
+
+    def mostrar_todos(self) -> List[Producto]:
+        return [self._fila_a_producto(f) for f in self._con.execute(self.SQL_SELECCION + " ORDER BY rowid")]
+
+    # Paginación por clave (keyset) sobre los índices de id y (nombre_min, id)
+    def pagina(self, orden: str = "id", cursor: Optional[str] = None, tam_pagina: int = 20) -> Pagina:
+        if orden not in ORDENES:
+            raise ValueError(f"Orden desconocido: {orden}. Use uno de {', '.join(ORDENES)}.")
+        if orden == "id":
+            condicion, parametros, columnas = "id > ?", (cursor,), "id"
+        else:
+            nombre_min, _, pid = (cursor or "").partition("\0")
+            condicion, parametros, columnas = "(nombre_min, id) > (?, ?)", (nombre_min, pid), "nombre_min, id"
+        if cursor is None:
+            condicion, parametros = "1", ()
+        filas = self._con.execute(
+            f"SELECT id, nombre, cantidad, precio, nombre_min FROM productos WHERE {condicion} "
+            f"ORDER BY {columnas} LIMIT ?", (*parametros, tam_pagina + 1)).fetchall()
+        siguiente = None
+        if len(filas) > tam_pagina:
+            filas = filas[:tam_pagina]
+            ultima = filas[-1]
+            siguiente = self._clave_orden(orden, ultima[0], ultima[4])
+        return Pagina([self._fila_a_producto(f[:4]) for f in filas], siguiente)
+
+    def _existe(self, pid: str) -> bool:
+        return self._con.execute("SELECT 1 FROM productos WHERE id = ?", (pid,)).fetchone() is not None
+
+    def _obtener(self, pid: str) -> Producto:
+        fila = self._con.execute(self.SQL_SELECCION + " WHERE id = ?", (pid,)).fetchone()
+        if fila is None:
+            raise KeyError(pid)
+        return self._fila_a_producto(fila)
+
+    # Los reportes se resuelven dentro de SQLite, sin traer las filas a Python
+    def valor_total(self) -> float:
+        return self._con.execute("SELECT COALESCE(SUM(cantidad * precio), 0) FROM productos").fetchone()[0]
+
+    def productos_bajo_stock(self, umbral: int) -> List[Producto]:
+        filas = self._con.execute(self.SQL_SELECCION + " WHERE cantidad < ?", (umbral,))
+        return [self._fila_a_producto(f) for f in filas]
+
+    def histograma_precios(self, bandas: int = 5) -> List[Tuple[float, float, int]]:
+        if bandas < 1:
+            raise ValueError("El número de bandas debe ser >= 1.")
+        minimo, maximo = self._con.execute("SELECT MIN(precio), MAX(precio) FROM productos").fetchone()
+        if minimo is None:
+            return []
+        ancho = (maximo - minimo) / bandas or 1.0
+        conteos = [0] * bandas
+        for banda, total in self._con.execute(
+                "SELECT MIN(CAST((precio - ?) / ? AS INTEGER), ?) AS banda, COUNT(*) FROM productos GROUP BY banda",
+                (minimo, ancho, bandas - 1)):
+            conteos[banda] = total
+        return [(minimo + i * ancho, minimo + (i + 1) * ancho, conteos[i]) for i in range(bandas)]
+
+
+# Motores de almacenamiento disponibles para el menú
+MOTORES = {"memoria": Inventario, "columnar": InventarioColumnar, "sqlite": InventarioSQLite}
 
-    # Cargar inventario desde archivo
-    def cargar_desde_archivo(self, ruta: str) -> None:
-        if not os.path.exists(ruta):
-            return
-        with open(ruta, "r", encoding="utf-8") as f:
-            datos = json.load(f)
-            for d in datos:
-                prod = Producto.from_dict(d)
-                self.anadir_producto(prod)
 
 # Funciones auxiliares para entrada de datos
 def input_no_vacio(msg: str) -> str:
@@ -126,21 +699,38 @@ def input_entero(msg: str) -> int:
 def input_float(msg: str) -> float:
     return float(input_no_vacio(msg))
 
-# Mostrar productos en tabla simple
-def imprimir_tabla(productos: List[Producto]) -> None:
-    if not productos:
-        print("(sin resultados)")
-        return
-    print(f"{'ID':<8} {'Nombre':<20} {'Cant':<6} {'Precio':<8}")
-    print("-"*44)
-    for p in productos:
+# Mostrar productos en tabla simple, de tam_pagina en tam_pagina filas.
+# Acepta cualquier iterable: con un generador solo se lee lo que se muestra.
+def imprimir_tabla(productos: Iterable[Producto], tam_pagina: int = 20) -> None:
+    n = 0
+    for n, p in enumerate(productos, 1):
+        if n == 1:
+            print(f"{'ID':<8} {'Nombre':<20} {'Cant':<6} {'Precio':<8}")
+            print("-"*44)
+        elif (n - 1) % tam_pagina == 0 and input("-- Enter: más resultados, q: terminar -- ").strip().lower() == "q":
+            return
         print(f"{p.id:<8} {p.nombre:<20} {p.cantidad:<6} {p.precio:<8.2f}")
+    if n == 0:
+        print("(sin resultados)")
 
 # Menú principal
-def menu():
-    inventario = Inventario()
+def menu(motor: str = "memoria"):
     ARCHIVO = "inventario.json"
-    inventario.cargar_desde_archivo(ARCHIVO)
+    if motor == "sqlite":
+        # La base se guarda con cada operación; migrar_a_sqlite.py importa el JSON
+        inventario = InventarioSQLite("inventario.db")
+        guardar = lambda: None
+    else:
+        inventario = MOTORES[motor]()
+        guardar = lambda: inventario.guardar_en_archivo(ARCHIVO)
+        informe = inventario.cargar_desde_archivo(
+            ARCHIVO, progreso=lambda n: print(f"\rCargando... {n} registros", end="", flush=True))
+        if informe.origen:
+            print(f"\r📂 {informe.cargados} productos cargados.      ")
+        if informe.duplicados:
+            print(f"⚠ {len(informe.duplicados)} IDs duplicados ignorados: {', '.join(informe.duplicados[:10])}")
+        for posicion, motivo in informe.invalidos[:10]:
+            print(f"⚠ Registro {posicion} inválido: {motivo}")
 
     while True:
         print("\n=== MENÚ INVENTARIO ===")
@@ -151,6 +741,9 @@ def menu():
         print("5. Buscar por nombre")
         print("6. Mostrar todos")
         print("7. Guardar inventario")
+        print("8. Valor total del inventario")
+        print("9. Productos con stock bajo")
+        print("10. Histograma de precios")
         print("0. Salir")
 
         opcion = input_no_vacio("Seleccione opción: ")
@@ -190,14 +783,27 @@ def menu():
                     print("❌ No se encontró ningún producto.")
 
             elif opcion == "6":
-                imprimir_tabla(inventario.mostrar_todos())
+                orden = input("Ordenar por (id/nombre) [id]: ").strip().lower() or "id"
+                imprimir_tabla(inventario.iterar_ordenado(orden))
 
             elif opcion == "7":
-                inventario.guardar_en_archivo(ARCHIVO)
+                guardar()
                 print("Inventario guardado 💾")
 
+            elif opcion == "8":
+                print(f"Valor total del inventario: ${inventario.valor_total():,.2f} 💰")
+
+            elif opcion == "9":
+                umbral = input_entero("Umbral de reposición: ")
+                imprimir_tabla(inventario.productos_bajo_stock(umbral))
+
+            elif opcion == "10":
+                bandas = input_entero("Número de bandas: ")
+                for desde, hasta, total in inventario.histograma_precios(bandas):
+                    print(f"${desde:>9.2f} - ${hasta:>9.2f} | {'█' * min(total, 40):<40} {total}")
+
             elif opcion == "0":
-                inventario.guardar_en_archivo(ARCHIVO)
+                guardar()
                 print("Saliendo... Inventario guardado 👋")
                 break
             else:
@@ -208,4 +814,5 @@ def menu():
 
 #  Ejecutar el programa
 if __name__ == "__main__":
-    menu()
+    # Uso: python Sistema_avanzado_de_gestion_de_inventario.py [memoria|columnar|sqlite]
+    menu(sys.argv[1] if len(sys.argv) > 1 else "memoria")
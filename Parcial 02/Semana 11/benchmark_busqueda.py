@@ -0,0 +1,63 @@
+# Benchmark: búsqueda por subcadena con índice de trigramas vs. recorrido lineal
+#
+# Uso: python benchmark_busqueda.py [tamaños...]   (por defecto 10000 100000 1000000)
+
+import random
+import sys
+import time
+from typing import List
+
+from Sistema_avanzado_de_gestion_de_inventario import Inventario, Producto
+
+PRODUCTOS = ["Camiseta", "Pantalon", "Cartera", "Reloj", "Buso", "Calcetines", "Gorra", "Chaqueta",
+             "Zapato", "Bufanda", "Cinturon", "Mochila", "Bolso", "Vestido", "Falda", "Sandalia"]
+ADJETIVOS = ["azul", "rojo", "negro", "blanco", "verde", "clasico", "deportivo", "infantil",
+             "premium", "basico", "elegante", "casual"]
+CONSULTAS = ["camiseta azul", "reloj", "ntalo", "premium 4242", "zz-no-existe", "bolso elegante 1"]
+
+
+def crear_inventario(n: int) -> Inventario:
+    rnd = random.Random(n)
+    inventario = Inventario()
+    for i in range(n):
+        nombre = f"{rnd.choice(PRODUCTOS)} {rnd.choice(ADJETIVOS)} {i}"
+        inventario.anadir_producto(Producto(str(i), nombre, rnd.randint(0, 100), 9.99))
+    return inventario
+
+
+# Algoritmo anterior: comprobar la subcadena contra todas las claves del índice
+def buscar_lineal(inventario: Inventario, nombre: str) -> List[Producto]:
+    nombre = nombre.lower()
+    ids = set()
+    for clave, pid_set in inventario._indice_nombre.items():
+        if nombre in clave:
+            ids |= pid_set
+    return [inventario._productos[pid] for pid in ids]
+
+
+def medir(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main() -> None:
+    tamanos = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'Productos':>10} {'Consulta':<16} {'Result.':>8} {'Lineal ms':>10} {'Trigramas ms':>13} {'x':>7}")
+    print("-" * 68)
+    for n in tamanos:
+        inventario = crear_inventario(n)
+        for consulta in CONSULTAS:
+            esperado = {p.id for p in buscar_lineal(inventario, consulta)}
+            obtenido = {p.id for p in inventario.buscar_por_nombre(consulta)}
+            assert esperado == obtenido, f"Resultados distintos para '{consulta}'"
+            repeticiones = max(1, 200_000 // n)
+            lineal = medir(lambda: buscar_lineal(inventario, consulta), repeticiones)
+            indexado = medir(lambda: inventario.buscar_por_nombre(consulta), repeticiones)
+            print(f"{n:>10} {consulta:<16} {len(obtenido):>8} {lineal:>10.3f} {indexado:>13.3f} "
+                  f"{lineal / indexado if indexado else float('inf'):>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
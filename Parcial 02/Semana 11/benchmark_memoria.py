@@ -0,0 +1,58 @@
+# Benchmark: memoria y velocidad de recorrido de Inventario (diccionario de
+# objetos) frente a InventarioColumnar (columnas compactas)
+#
+# Uso: python benchmark_memoria.py [tamaños...]   (por defecto 100000 1000000)
+# Cada medición se hace en un proceso aparte para que la memoria residente
+# de un motor no contamine la del otro.
+
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from Sistema_avanzado_de_gestion_de_inventario import Inventario, InventarioColumnar, Producto
+
+MOTORES = {"objetos": Inventario, "columnar": InventarioColumnar}
+
+
+def memoria_residente_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return float("nan")
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KiB y macOS en bytes
+    return maximo / 1024 / 1024 if sys.platform == "darwin" else maximo / 1024
+
+
+def medir(motor: str, n: int) -> None:
+    tracemalloc.start()
+    inventario = MOTORES[motor]()
+    inicio = time.perf_counter()
+    for i in range(n):
+        inventario.anadir_producto(Producto(f"P{i:07d}", f"Producto {i % 5000}", i % 100, 9.99))
+    carga = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    valor = sum(p.cantidad * p.precio for p in inventario.mostrar_todos())
+    recorrido = time.perf_counter() - inicio
+    print(f"{motor:<9} {n:>9} {memoria / n:>12.1f} {memoria_residente_mb():>10.1f} "
+          f"{carga:>9.2f} {n / recorrido / 1e6:>12.2f}   (valor={valor:.0f})")
+
+
+def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == "--medir":
+        medir(sys.argv[2], int(sys.argv[3]))
+        return
+    tamanos = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]
+    print(f"{'Motor':<9} {'Productos':>9} {'Bytes/prod':>12} {'RSS MB':>10} {'Carga s':>9} {'Mprod/s rec.':>12}")
+    print("-" * 68)
+    for n in tamanos:
+        for motor in MOTORES:
+            subprocess.run([sys.executable, __file__, "--medir", motor, str(n)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Importación y exportación masiva del inventario (CSV, JSON Lines o JSON)
+#
+# Uso:
+#   python importar_exportar.py importar productos.csv [--motor memoria|columnar|sqlite]
+#   python importar_exportar.py exportar respaldo.jsonl [--motor ...]
+#
+# Con los motores en memoria el inventario se lee de inventario.json, cada
+# lote se añade a un diario (inventario.json.importando.jsonl) y el archivo
+# completo se reescribe una sola vez al terminar; con "sqlite" se trabaja
+# directamente sobre inventario.db. Si la importación se interrumpe, los lotes
+# ya confirmados quedan guardados y se recuperan en la siguiente carga.
+
+import argparse
+import sys
+import time
+
+from Sistema_avanzado_de_gestion_de_inventario import MOTORES, InventarioSQLite
+
+ARCHIVO = "inventario.json"
+BASE_DATOS = "inventario.db"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Importa o exporta productos del inventario.")
+    parser.add_argument("accion", choices=["importar", "exportar"])
+    parser.add_argument("archivo", help="archivo .csv, .jsonl o .json")
+    parser.add_argument("--motor", choices=sorted(MOTORES), default="memoria")
+    parser.add_argument("--lote", type=int, default=5000, help="productos por lote")
+    args = parser.parse_args()
+
+    if args.motor == "sqlite":
+        inventario = InventarioSQLite(BASE_DATOS)
+    else:
+        inventario = MOTORES[args.motor]()
+        inventario.cargar_desde_archivo(ARCHIVO)
+
+    inicio = time.perf_counter()
+    try:
+        if args.accion == "exportar":
+            total = inventario.exportar(args.archivo)
+            print(f"✅ {total} productos exportados a {args.archivo}")
+            return 0
+
+        progreso = lambda n: print(f"\rImportando... {n} registros", end="", flush=True)
+        if isinstance(inventario, InventarioSQLite):
+            # Cada lote ya es una transacción
+            informe = inventario.importar(args.archivo, tam_lote=args.lote, progreso=progreso)
+        else:
+            informe = inventario.importar_con_diario(args.archivo, ARCHIVO, tam_lote=args.lote,
+                                                     progreso=progreso)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    finally:
+        if isinstance(inventario, InventarioSQLite):
+            inventario.cerrar()
+
+    segundos = time.perf_counter() - inicio
+    print(f"\r✅ {informe.cargados} productos importados en {segundos:.2f} s "
+          f"({informe.cargados / segundos if segundos else 0:,.0f} filas/s)")
+    if informe.duplicados:
+        print(f"⚠ {len(informe.duplicados)} IDs duplicados ignorados")
+    for posicion, motivo in informe.invalidos[:20]:
+        print(f"⚠ Registro {posicion} inválido: {motivo}")
+    if len(informe.invalidos) > 20:
+        print(f"⚠ ... y {len(informe.invalidos) - 20} registros inválidos más")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
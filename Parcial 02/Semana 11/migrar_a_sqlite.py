@@ -0,0 +1,40 @@
+# Migra inventario.json a una base SQLite para usar el motor "sqlite"
+#
+# Uso: python migrar_a_sqlite.py [origen.json] [destino.db] [--lote N]
+
+import argparse
+import os
+import sys
+import time
+
+from Sistema_avanzado_de_gestion_de_inventario import InventarioSQLite
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migra el inventario JSON a SQLite.")
+    parser.add_argument("origen", nargs="?", default="inventario.json", help="archivo JSON de origen")
+    parser.add_argument("destino", nargs="?", default="inventario.db", help="base SQLite de destino")
+    parser.add_argument("--lote", type=int, default=5000, help="productos por transacción")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.origen):
+        print(f"❌ No existe el archivo {args.origen}")
+        return 1
+
+    inventario = InventarioSQLite(args.destino)
+    inicio = time.perf_counter()
+    informe = inventario.cargar_desde_archivo(
+        args.origen, tam_lote=args.lote,
+        progreso=lambda n: print(f"\rMigrando... {n} registros", end="", flush=True))
+    inventario.cerrar()
+
+    print(f"\r✅ {informe.cargados} productos migrados a {args.destino} en {time.perf_counter() - inicio:.2f} s")
+    if informe.duplicados:
+        print(f"⚠ {len(informe.duplicados)} IDs duplicados o ya existentes ignorados")
+    for posicion, motivo in informe.invalidos:
+        print(f"⚠ Registro {posicion} inválido: {motivo}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
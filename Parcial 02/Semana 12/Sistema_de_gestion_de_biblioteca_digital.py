@@ -1,7 +1,208 @@
 # 📚 Sistema de Biblioteca Digital
 
+import atexit
+import bisect
+import heapq
 import json
+import math
 import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Persistencia compartida de Parcial 02 (carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from persistencia import escribir_json_lote, leer_json_con_respaldo
+
+# ==============================
+# Índice de búsqueda de texto completo
+# ==============================
+CAMPOS_BUSQUEDA = ("titulo", "autor", "categoria")
+PESOS_CAMPO = {"titulo": 3.0, "autor": 2.0, "categoria": 1.0}
+PESO_PREFIJO = 0.6  # una coincidencia por prefijo puntúa menos que una exacta
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Ñandú Épico' -> 'nandu epico'."""
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    return re.findall(r"\w+", normalizar(texto))
+
+
+class IndiceTextual:
+    """Índice invertido por campo: término -> {isbn: frecuencia}.
+
+    Cada campo guarda además su vocabulario ordenado, para encontrar por
+    búsqueda binaria todos los términos que empiezan por un prefijo.
+    """
+
+    def __init__(self):
+        self.postings = {campo: defaultdict(dict) for campo in CAMPOS_BUSQUEDA}
+        self.vocabulario = {campo: [] for campo in CAMPOS_BUSQUEDA}
+        self.total = 0
+
+    def agregar(self, libro):
+        self.total += 1
+        for campo in CAMPOS_BUSQUEDA:
+            postings = self.postings[campo]
+            for termino in tokenizar(getattr(libro, campo)):
+                if termino not in postings:
+                    bisect.insort(self.vocabulario[campo], termino)
+                documentos = postings[termino]
+                documentos[libro.isbn] = documentos.get(libro.isbn, 0) + 1
+
+    def _expandir(self, campo, prefijo):
+        vocabulario = self.vocabulario[campo]
+        i = bisect.bisect_left(vocabulario, prefijo)
+        while i < len(vocabulario) and vocabulario[i].startswith(prefijo):
+            yield vocabulario[i]
+            i += 1
+
+    def _plan(self, campo, texto):
+        """Para cada palabra, los términos que la contienen como prefijo y su peso.
+
+        Las palabras más selectivas (menos documentos) quedan primero.
+        """
+        if campo not in self.postings:
+            raise ValueError(f"Campo de búsqueda desconocido: {campo}")
+        plan = []
+        for token in tokenizar(texto):
+            terminos = []
+            for termino in self._expandir(campo, token):
+                documentos = self.postings[campo][termino]
+                idf = math.log(1 + self.total / len(documentos))
+                peso = PESOS_CAMPO[campo] * idf * (1.0 if termino == token else PESO_PREFIJO)
+                terminos.append((documentos, peso))
+            plan.append((sum(len(d) for d, _ in terminos), terminos))
+        plan.sort(key=lambda paso: paso[0])
+        return plan
+
+    @staticmethod
+    def _evaluar(plan, candidatos=None):
+        """Libros que cumplen todas las palabras del plan, con su puntuación.
+
+        Si ya hay pocos candidatos se consulta cada uno en los postings en
+        lugar de recorrer los postings completos de una palabra frecuente.
+        """
+        if not plan:
+            return {}
+        resultado = candidatos
+        for tamano, terminos in plan:
+            if resultado is not None and len(resultado) <= tamano:
+                nuevo = {}
+                for isbn, acumulado in resultado.items():
+                    puntos = 0.0
+                    for documentos, peso in terminos:
+                        frecuencia = documentos.get(isbn)
+                        if frecuencia:
+                            puntos += peso * frecuencia
+                    if puntos:
+                        nuevo[isbn] = acumulado + puntos
+                resultado = nuevo
+            else:
+                puntos = defaultdict(float)
+                for documentos, peso in terminos:
+                    for isbn, frecuencia in documentos.items():
+                        puntos[isbn] += peso * frecuencia
+                if resultado is None:
+                    resultado = puntos
+                else:
+                    resultado = {isbn: resultado[isbn] + p for isbn, p in puntos.items() if isbn in resultado}
+            if not resultado:
+                return {}
+        return resultado
+
+    def buscar(self, criterios, todos=False, limite=None):
+        """Devuelve [(isbn, puntuación)] ordenado de mayor a menor puntuación.
+
+        criterios: {campo: texto}. Con todos=True un libro debe cumplir
+        todos los campos (Y); si no, basta con uno (O). Sin criterios no
+        hay resultados.
+        """
+        if not criterios:
+            return []
+        planes = [self._plan(campo, texto) for campo, texto in criterios.items()]
+        if todos:
+            # El campo más selectivo primero: los demás solo filtran candidatos
+            planes.sort(key=lambda plan: plan[0][0] if plan else 0)
+            resultado = None
+            for plan in planes:
+                resultado = self._evaluar(plan, resultado)
+                if not resultado:
+                    return []
+        else:
+            resultado = {}
+            for plan in planes:
+                for isbn, puntos in self._evaluar(plan).items():
+                    resultado[isbn] = resultado.get(isbn, 0.0) + puntos
+        if limite is not None:
+            return heapq.nlargest(limite, resultado.items(), key=lambda par: par[1])
+        return sorted(resultado.items(), key=lambda par: -par[1])
+
+
+# ==============================
+# Errores de la biblioteca
+# ==============================
+class ErrorBiblioteca(Exception):
+    """Base de los errores que la biblioteca comunica al llamador."""
+
+
+class UsuarioNoRegistrado(ErrorBiblioteca):
+    def __init__(self, id_usuario):
+        super().__init__("Usuario no registrado.")
+        self.id_usuario = id_usuario
+
+
+class LibroNoEncontrado(ErrorBiblioteca):
+    def __init__(self, isbn):
+        super().__init__("Libro no encontrado.")
+        self.isbn = isbn
+
+
+class LibroYaPrestado(ErrorBiblioteca):
+    def __init__(self, isbn):
+        super().__init__("El libro ya está prestado.")
+        self.isbn = isbn
+
+
+class LibroNoPrestado(ErrorBiblioteca):
+    def __init__(self, id_usuario, isbn):
+        super().__init__("El usuario no tiene prestado ese libro.")
+        self.id_usuario = id_usuario
+        self.isbn = isbn
+
+
+class LibroDuplicado(ErrorBiblioteca):
+    def __init__(self, isbn):
+        super().__init__("El libro ya está registrado.")
+        self.isbn = isbn
+
+
+class UsuarioDuplicado(ErrorBiblioteca):
+    def __init__(self, id_usuario):
+        super().__init__("ID de usuario ya existente.")
+        self.id_usuario = id_usuario
+
+
+class DiasPrestamoInvalidos(ErrorBiblioteca, ValueError):
+    def __init__(self, dias):
+        super().__init__("Los días de préstamo deben ser un entero mayor que cero.")
+        self.dias = dias
+
+
+class LoteCancelado(ErrorBiblioteca):
+    def __init__(self):
+        super().__init__("Lote cancelado: otro elemento del lote no era válido.")
+
 
 # ==============================
 # Clase Libro
@@ -50,150 +251,727 @@ class Usuario:
 
     @classmethod
     def from_dict(cls, data):
-        usuario = cls(data["nombre"], data["id_usuario"])
-        usuario.libros_prestados = data.get("libros_prestados", [])
-        return usuario
+        # Los préstamos se asignan desde prestamos.json, que es la fuente de verdad
+        return cls(data["nombre"], data["id_usuario"])
+
+
+# ==============================
+# Clase Prestamo
+# ==============================
+class Prestamo:
+    """Préstamo activo de un libro, con fecha de salida y de vencimiento.
+
+    Los préstamos antiguos (prestamos.json sin fechas) quedan sin fechas y
+    no participan en el control de vencimientos.
+    """
+
+    def __init__(self, isbn, id_usuario, fecha_prestamo=None, fecha_vencimiento=None):
+        self.isbn = isbn
+        self.id_usuario = id_usuario
+        self.fecha_prestamo = fecha_prestamo
+        self.fecha_vencimiento = fecha_vencimiento
+
+    def __str__(self):
+        vence = self.fecha_vencimiento.strftime("%Y-%m-%d") if self.fecha_vencimiento else "sin fecha"
+        return f"ISBN: {self.isbn} | Usuario: {self.id_usuario} | Vence: {vence}"
+
+    def to_dict(self):
+        return {
+            "isbn": self.isbn,
+            "prestado": self.fecha_prestamo.isoformat(timespec="seconds") if self.fecha_prestamo else None,
+            "vence": self.fecha_vencimiento.isoformat(timespec="seconds") if self.fecha_vencimiento else None,
+        }
+
+    @classmethod
+    def from_dict(cls, id_usuario, data):
+        # Formato anterior: solo el ISBN
+        if isinstance(data, str):
+            return cls(data, id_usuario)
+        prestado, vence = data.get("prestado"), data.get("vence")
+        return cls(data["isbn"], id_usuario,
+                   datetime.fromisoformat(prestado) if prestado else None,
+                   datetime.fromisoformat(vence) if vence else None)
+
+
+# ==============================
+# Resultado de una operación en lote
+# ==============================
+class ResultadoLote:
+    """Resultado de un elemento de prestar_lote / devolver_lote.
+
+    error es None si la operación se aplicó; si no, la ErrorBiblioteca que
+    la impidió.
+    """
+
+    __slots__ = ("id_usuario", "isbn", "error")
+
+    def __init__(self, id_usuario, isbn, error=None):
+        self.id_usuario = id_usuario
+        self.isbn = isbn
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def motivo(self):
+        return str(self.error) if self.error else None
+
+    def __repr__(self):
+        return f"ResultadoLote({self.id_usuario!r}, {self.isbn!r}, {self.motivo!r})"
+
+
+# ==============================
+# Página de un listado
+# ==============================
+class Pagina:
+    """Elementos de una página y cursor de la siguiente (None si es la última).
+
+    El cursor es la clave del último elemento, así que sigue siendo válido
+    aunque la biblioteca cambie entre una página y otra.
+    """
+
+    __slots__ = ("elementos", "siguiente")
+
+    def __init__(self, elementos, siguiente=None):
+        self.elementos = elementos
+        self.siguiente = siguiente
+
+
+# ==============================
+# Colección con carga perezosa
+# ==============================
+class ColeccionPerezosa(MutableMapping):
+    """Diccionario id -> objeto que se llena cuando termina de leerse su archivo.
+
+    Mientras nadie pida un objeto, se guarda el registro JSON tal cual; el
+    objeto se construye la primera vez que se accede a él. Consultar si un
+    id existe o recorrer los ids no construye nada.
+    """
+
+    def __init__(self, futuro, clave, fabrica):
+        self._futuro = futuro    # Future que devuelve la lista de registros
+        self._clave = clave
+        self._fabrica = fabrica
+        self._datos = None       # id -> objeto o registro (dict) sin construir
+
+    def _resueltos(self):
+        if self._datos is None:
+            self._datos = {registro[self._clave]: registro for registro in self._futuro.result()}
+        return self._datos
+
+    def __getitem__(self, clave):
+        datos = self._resueltos()
+        valor = datos[clave]
+        if type(valor) is dict:
+            valor = datos[clave] = self._fabrica(valor)
+        return valor
+
+    def __setitem__(self, clave, valor):
+        self._resueltos()[clave] = valor
+
+    def __delitem__(self, clave):
+        del self._resueltos()[clave]
+
+    def __contains__(self, clave):
+        return clave in self._resueltos()
+
+    def __iter__(self):
+        return iter(self._resueltos())
+
+    def __len__(self):
+        return len(self._resueltos())
 
 
 # ==============================
 # Clase Biblioteca
 # ==============================
 class Biblioteca:
-    def __init__(self):
-        self.libros = {}     # isbn: Libro
-        self.usuarios = {}   # id_usuario: Usuario
+    ARCHIVOS = {"libros": "libros.json", "usuarios": "usuarios.json", "prestamos": "prestamos.json"}
+    ARCHIVO_HISTORIAL = "historial_prestamos.jsonl"  # registro de préstamos y devoluciones (solo se añade)
+    DIAS_PRESTAMO = 14
+
+    def __init__(self, perezosa=False, ventana_guardado=0):
+        """Con perezosa=True el constructor no espera a leer los archivos: los
+        objetos e índices se construyen la primera vez que se necesitan.
+
+        ventana_guardado (segundos): si es > 0, los guardados pedidos dentro de
+        esa ventana desde el último se agrupan en uno solo, que se hace al
+        vencer la ventana desde un hilo temporizador. Con una ventana, los
+        cambios deben hacerse con bloqueo tomado.
+        """
+        self.ventana_guardado = ventana_guardado
+        self.bloqueo = threading.RLock()  # cambios frente al guardado diferido
+        self._sucios = set()  # colecciones con cambios sin guardar
+        self._registros = {}  # colección -> {id: registro JSON}, ver _registros_al_dia
+        self._cambiados = defaultdict(set)  # colección -> ids cambiados desde la última instantánea
+        self._historial_pendiente = []  # eventos aún no escritos en el historial
+        self._ultimo_guardado = 0.0
+        self._temporizador = None  # guardado diferido programado
+        self.libros = {}       # isbn: Libro
+        self.usuarios = {}     # id_usuario: Usuario
+        self._indices = None   # (prestamos, disponibles), ver _construir_indices
+        self._indice_textual = None
+        self._isbns_por_usuario = {}
+        self._ordenes = {}     # claves ordenadas para paginar, ver _claves_orden
         self.cargar_datos()
+        if not perezosa:
+            self._construir_indices()
+            self._construir_indice_textual()
+
+    # Índices derivados, construidos bajo demanda
+    @property
+    def prestamos(self):
+        """isbn: Prestamo (índice de libros prestados)."""
+        return (self._indices or self._construir_indices())[0]
+
+    @property
+    def disponibles(self):
+        """isbn: None (conjunto ordenado de libros no prestados)."""
+        return (self._indices or self._construir_indices())[1]
+
+    @property
+    def indice(self):
+        """Índice de texto completo de los libros."""
+        return self._indice_textual or self._construir_indice_textual()
 
     def cargar_datos(self):
-        # Cargar libros
-        if os.path.exists("libros.json"):
-            with open("libros.json", "r") as f:
-                libros_data = json.load(f)
-                for libro_dict in libros_data:
-                    libro = Libro.from_dict(libro_dict)
-                    self.libros[libro.isbn] = libro
-
-        # Cargar usuarios
-        if os.path.exists("usuarios.json"):
-            with open("usuarios.json", "r") as f:
-                usuarios_data = json.load(f)
-                for usuario_dict in usuarios_data:
-                    usuario = Usuario.from_dict(usuario_dict)
-                    self.usuarios[usuario.id_usuario] = usuario
-
-        # Cargar préstamos y asignar libros prestados
-        if os.path.exists("prestamos.json"):
-            with open("prestamos.json", "r") as f:
-                prestamos_data = json.load(f)
-                for user_id, lista_isbns in prestamos_data.items():
-                    if user_id in self.usuarios:
-                        usuario = self.usuarios[user_id]
-                        usuario.libros_prestados = []
-                        for isbn in lista_isbns:
-                            if isbn in self.libros:
-                                usuario.libros_prestados.append(self.libros[isbn])
-
-    def guardar_datos(self):
-        with open("libros.json", "w") as f:
-            json.dump([libro.to_dict() for libro in self.libros.values()], f, indent=4)
-
-        with open("usuarios.json", "w") as f:
-            json.dump([usuario.to_dict() for usuario in self.usuarios.values()], f, indent=4)
-
-        prestamos = {
-            usuario.id_usuario: [libro.isbn for libro in usuario.libros_prestados]
-            for usuario in self.usuarios.values() if usuario.libros_prestados
-        }
-        with open("prestamos.json", "w") as f:
-            json.dump(prestamos, f, indent=4)
+        # Los tres archivos se leen a la vez en hilos aparte
+        ejecutor = ThreadPoolExecutor(max_workers=3)
+        futuro_libros = ejecutor.submit(leer_json_con_respaldo, self.ARCHIVOS["libros"], [])
+        futuro_usuarios = ejecutor.submit(leer_json_con_respaldo, self.ARCHIVOS["usuarios"], [])
+        self._futuro_prestamos = ejecutor.submit(leer_json_con_respaldo, self.ARCHIVOS["prestamos"], {})
+        ejecutor.shutdown(wait=False)
+
+        self.libros = ColeccionPerezosa(futuro_libros, "isbn", Libro.from_dict)
+        self.usuarios = ColeccionPerezosa(futuro_usuarios, "id_usuario", self._crear_usuario)
+        self._indices = None
+        self._indice_textual = None
+        self._ordenes = {}
+        self._sucios.clear()
+        self._registros = {}
+        self._cambiados.clear()
+
+    def _construir_indices(self):
+        # Solo hacen falta los ids de libros y usuarios, no sus objetos
+        prestamos = {}
+        por_usuario = defaultdict(list)
+        for user_id, lista in self._futuro_prestamos.result().items():
+            if user_id in self.usuarios:
+                for registro in lista:
+                    prestamo = Prestamo.from_dict(user_id, registro)
+                    # Un mismo libro no puede quedar prestado a dos usuarios
+                    if prestamo.isbn in self.libros and prestamo.isbn not in prestamos:
+                        prestamos[prestamo.isbn] = prestamo
+                        por_usuario[user_id].append(prestamo.isbn)
+        self._isbns_por_usuario = por_usuario
+        disponibles = {isbn: None for isbn in self.libros if isbn not in prestamos}
+        self._indices = (prestamos, disponibles)
+        self._construir_vencimientos()
+        return self._indices
+
+    # ----------------------------
+    # Control de vencimientos: montículo (heap) de préstamos por fecha de
+    # vencimiento. Las devoluciones no se borran del heap: sus entradas
+    # quedan obsoletas y se descartan al recorrerlo.
+    # ----------------------------
+    def _construir_vencimientos(self):
+        self._vencimientos = [(p.fecha_vencimiento, n, p)
+                              for n, p in enumerate(self.prestamos.values()) if p.fecha_vencimiento]
+        heapq.heapify(self._vencimientos)
+        self._secuencia = len(self._vencimientos)
+        self._obsoletos = 0
+
+    def _programar_vencimiento(self, prestamo):
+        self._secuencia += 1
+        heapq.heappush(self._vencimientos, (prestamo.fecha_vencimiento, self._secuencia, prestamo))
+
+    def _descartar_vencimiento(self, prestamo):
+        if prestamo.fecha_vencimiento is None:
+            return
+        self._obsoletos += 1
+        # Si más de la mitad del heap es basura, se reconstruye
+        if self._obsoletos * 2 > len(self._vencimientos):
+            self._construir_vencimientos()
+
+    def _recorrer_vencimientos(self):
+        """Préstamos activos en orden de vencimiento, sin modificar el heap.
+
+        Un heap auxiliar guarda la frontera de posiciones pendientes, así que
+        obtener los k primeros cuesta O(k log k) (más las entradas obsoletas).
+        """
+        prestamos = self.prestamos  # construye los índices (y el heap) si hace falta
+        heap = self._vencimientos
+        frontera = [(heap[0][0], heap[0][1], 0)] if heap else []
+        while frontera:
+            _, _, i = heapq.heappop(frontera)
+            prestamo = heap[i][2]
+            if prestamos.get(prestamo.isbn) is prestamo:
+                yield prestamo
+            for hijo in (2 * i + 1, 2 * i + 2):
+                if hijo < len(heap):
+                    heapq.heappush(frontera, (heap[hijo][0], heap[hijo][1], hijo))
+
+    def proximos_vencidos(self, n, ahora=None):
+        """Los n préstamos vencidos más antiguos."""
+        ahora = ahora or datetime.now()
+        resultado = []
+        for prestamo in self._recorrer_vencimientos():
+            if prestamo.fecha_vencimiento > ahora or len(resultado) == n:
+                break
+            resultado.append(prestamo)
+        return resultado
+
+    def vencidos(self, hasta=None):
+        """Todos los préstamos vencidos a la fecha indicada (por defecto, ahora)."""
+        hasta = hasta or datetime.now()
+        resultado = []
+        for prestamo in self._recorrer_vencimientos():
+            if prestamo.fecha_vencimiento > hasta:
+                break
+            resultado.append(prestamo)
+        return resultado
+
+    # ----------------------------
+    # Historial de préstamos
+    # ----------------------------
+    def _anotar_historial(self, evento, prestamo, fecha):
+        self._historial_pendiente.append({"evento": evento, "fecha": fecha.isoformat(timespec="seconds"),
+                                          "id_usuario": prestamo.id_usuario, **prestamo.to_dict()})
+        self._marcar("historial")
+
+    def _escribir_historial(self, eventos):
+        lineas = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in eventos)
+        with open(self.ARCHIVO_HISTORIAL, "a", encoding="utf-8") as f:
+            f.write(lineas)
+            f.flush()
+            os.fsync(f.fileno())
+        eventos.clear()
+
+    def historial(self, isbn=None, id_usuario=None):
+        """Recorre el historial (archivo y eventos pendientes), filtrando si se pide."""
+        def eventos():
+            if os.path.exists(self.ARCHIVO_HISTORIAL):
+                with open(self.ARCHIVO_HISTORIAL, "r", encoding="utf-8") as f:
+                    for linea in f:
+                        if linea.strip():
+                            yield json.loads(linea)
+            yield from list(self._historial_pendiente)
+
+        for evento in eventos():
+            if (isbn is None or evento["isbn"] == isbn) and (id_usuario is None or evento["id_usuario"] == id_usuario):
+                yield evento
+
+    def _construir_indice_textual(self):
+        self._indice_textual = IndiceTextual()
+        for libro in self.libros.values():
+            self._indice_textual.agregar(libro)
+        return self._indice_textual
+
+    def _crear_usuario(self, data):
+        # Préstamos asignados desde prestamos.json al construir el usuario
+        usuario = Usuario.from_dict(data)
+        if self._indices is None:
+            self._construir_indices()
+        usuario.libros_prestados = [self.libros[isbn] for isbn in self._isbns_por_usuario.pop(usuario.id_usuario, ())]
+        return usuario
+
+    # Mantienen el índice de préstamos y el de disponibles en O(1)
+    # ----------------------------
+    # Listados paginados. Cada orden es una lista de claves "texto\0id"
+    # (el texto normalizado; "\0" desempata por id y va antes que cualquier
+    # otro carácter). Se ordena la primera vez que se pide y después se
+    # mantiene con bisect en cada alta, préstamo o devolución.
+    # ----------------------------
+    def _claves_orden(self, orden):
+        claves = self._ordenes.get(orden)
+        if claves is None:
+            if orden == "libros":
+                claves = [normalizar(l.titulo) + "\0" + l.isbn for l in self.libros.values()]
+            elif orden == "usuarios":
+                claves = [normalizar(u.nombre) + "\0" + u.id_usuario for u in self.usuarios.values()]
+            else:  # "prestados", por título
+                claves = [normalizar(self.libros[isbn].titulo) + "\0" + isbn for isbn in self.prestamos]
+            claves.sort()
+            self._ordenes[orden] = claves
+        return claves
+
+    def _ordenar_alta(self, orden, texto, clave):
+        if orden in self._ordenes:
+            bisect.insort(self._ordenes[orden], normalizar(texto) + "\0" + clave)
+
+    def _ordenar_baja(self, orden, texto, clave):
+        if orden in self._ordenes:
+            claves = self._ordenes[orden]
+            del claves[bisect.bisect_left(claves, normalizar(texto) + "\0" + clave)]
+
+    def _pagina(self, orden, cursor, tam_pagina, convertir, filtro=None):
+        claves = self._claves_orden(orden)
+        i = bisect.bisect_right(claves, cursor) if cursor is not None else 0
+        elementos = []
+        while i < len(claves) and len(elementos) < tam_pagina:
+            id_ = claves[i].rpartition("\0")[2]
+            i += 1
+            if filtro is None or filtro(id_):
+                elementos.append(convertir(id_))
+        return Pagina(elementos, claves[i - 1] if i < len(claves) else None)
+
+    def pagina_libros(self, cursor=None, tam_pagina=20, solo_disponibles=False):
+        """Libros ordenados por título."""
+        filtro = self.disponibles.__contains__ if solo_disponibles else None
+        return self._pagina("libros", cursor, tam_pagina, self.libros.__getitem__, filtro)
+
+    def pagina_usuarios(self, cursor=None, tam_pagina=20):
+        """Usuarios ordenados por nombre."""
+        return self._pagina("usuarios", cursor, tam_pagina, self.usuarios.__getitem__)
+
+    def pagina_prestados(self, cursor=None, tam_pagina=20):
+        """Pares (libro, usuario) de los libros prestados, ordenados por título."""
+        return self._pagina("prestados", cursor, tam_pagina,
+                            lambda isbn: (self.libros[isbn], self.quien_tiene(isbn)))
+
+    @staticmethod
+    def _recorrer(pedir_pagina, tam_pagina=200):
+        """Generador sobre todas las páginas; en memoria solo hay una a la vez."""
+        cursor = None
+        while True:
+            pagina = pedir_pagina(cursor, tam_pagina)
+            yield from pagina.elementos
+            if pagina.siguiente is None:
+                return
+            cursor = pagina.siguiente
+
+    def _registrar_prestamo(self, usuario, libro, ahora=None, dias=None):
+        # usuarios.json también lista los préstamos de cada usuario
+        self._marcar("prestamos", libro.isbn)
+        self._marcar("usuarios", usuario.id_usuario)
+        ahora = ahora or datetime.now()
+        prestamo = Prestamo(libro.isbn, usuario.id_usuario, ahora,
+                            ahora + timedelta(days=self.DIAS_PRESTAMO if dias is None else dias))
+        usuario.libros_prestados.append(libro)
+        self.prestamos[libro.isbn] = prestamo
+        self.disponibles.pop(libro.isbn, None)
+        self._ordenar_alta("prestados", libro.titulo, libro.isbn)
+        self._programar_vencimiento(prestamo)
+        self._anotar_historial("prestamo", prestamo, ahora)
+        return prestamo
+
+    def _registrar_devolucion(self, usuario, libro, ahora=None):
+        self._marcar("prestamos", libro.isbn)
+        self._marcar("usuarios", usuario.id_usuario)
+        usuario.libros_prestados.remove(libro)
+        prestamo = self.prestamos.pop(libro.isbn)
+        self.disponibles[libro.isbn] = None
+        self._ordenar_baja("prestados", libro.titulo, libro.isbn)
+        self._descartar_vencimiento(prestamo)
+        self._anotar_historial("devolucion", prestamo, ahora or datetime.now())
+        return prestamo
+
+    def _marcar(self, coleccion, *ids):
+        self._sucios.add(coleccion)
+        if ids:
+            self._cambiados[coleccion].update(ids)
 
+    def hay_cambios(self):
+        return bool(self._sucios)
+
+    def guardar_datos(self, forzar=False):
+        """Escribe solo los archivos cuyas colecciones cambiaron.
+
+        Sin cambios no hay E/S. Dentro de la ventana de guardado el trabajo
+        se pospone (los cambios siguen pendientes) salvo con forzar=True, y
+        se programa un guardado para cuando la ventana venza: los últimos
+        cambios no esperan a la próxima operación ni a la salida.
+        Devuelve True si se escribió algo.
+        """
+        with self.bloqueo:
+            if not self._sucios:
+                return False
+            restante = self.ventana_guardado - (time.monotonic() - self._ultimo_guardado)
+            if not forzar and restante > 0:
+                self._programar_guardado(restante)
+                return False
+            instantanea = self.tomar_instantanea()
+            try:
+                self.escribir_instantanea(instantanea)
+            except BaseException:
+                self.devolver_instantanea(instantanea)
+                raise
+            return True
+
+    def _programar_guardado(self, segundos):
+        if self._temporizador is not None:
+            return  # ya hay uno pendiente; guardará también estos cambios
+        self._temporizador = threading.Timer(segundos, self._guardado_diferido)
+        self._temporizador.daemon = True
+        self._temporizador.start()
+
+    def _guardado_diferido(self):
+        with self.bloqueo:
+            self._temporizador = None
+            try:
+                self.guardar_datos()
+            except OSError as e:
+                # Los cambios siguen pendientes para el próximo guardado
+                print(f"\n⚠️ No se pudo guardar: {e}")
+
+    def tomar_instantanea(self):
+        """Copia de los cambios pendientes que no comparte objetos con la biblioteca.
+
+        Deja la biblioteca sin cambios pendientes. Solo se vuelven a
+        serializar los elementos cambiados (ver _registros_al_dia); armar y
+        codificar los archivos completos queda para escribir_instantanea,
+        que puede ejecutarse en otro hilo mientras la biblioteca sigue
+        cambiando. Si falla, devolver_instantanea vuelve a marcar esos
+        cambios como pendientes.
+        """
+        archivos = {self.ARCHIVOS[coleccion]: (coleccion, self._registros_al_dia(coleccion))
+                    for coleccion in self.ARCHIVOS if coleccion in self._sucios}
+        instantanea = (archivos, self._historial_pendiente, set(self._sucios))
+        self._historial_pendiente = []
+        self._sucios.clear()
+        self._ultimo_guardado = time.monotonic()
+        return instantanea
+
+    def _registros_al_dia(self, coleccion):
+        """{id: registro JSON} de la colección, en una copia superficial.
+
+        Los registros se guardan de una instantánea a otra y solo se rehacen
+        los de los ids cambiados: O(cambios) en Python más una copia del
+        diccionario en C. Un registro nunca se modifica (se reemplaza), así
+        que la copia puede usarse desde otro hilo.
+        """
+        registros = self._registros.get(coleccion)
+        cambiados = self._cambiados.pop(coleccion, ())
+        if registros is None:
+            fuente = {"libros": self.libros, "usuarios": self.usuarios, "prestamos": self.prestamos}[coleccion]
+            registros = self._registros[coleccion] = {}
+            cambiados = fuente
+        for id_ in cambiados:
+            registro = self._registro(coleccion, id_)
+            if registro is None:
+                registros.pop(id_, None)
+            else:
+                registros[id_] = registro
+        return dict(registros)
+
+    def _registro(self, coleccion, id_):
+        if coleccion == "libros":
+            return self.libros[id_].to_dict() if id_ in self.libros else None
+        if coleccion == "usuarios":
+            return self.usuarios[id_].to_dict() if id_ in self.usuarios else None
+        prestamo = self.prestamos.get(id_)
+        return (prestamo.id_usuario, prestamo.to_dict()) if prestamo else None
+
+    def preparar_guardado(self):
+        """Serializa ya todas las colecciones, para que el primer guardado
+        también cueste solo O(cambios)."""
+        for coleccion in self.ARCHIVOS:
+            self._registros_al_dia(coleccion)
+
+    def escribir_instantanea(self, instantanea):
+        archivos, historial, _ = instantanea
+        # El historial va primero: un evento anotado sin su snapshot es inofensivo
+        if historial:
+            self._escribir_historial(historial)
+        # Los archivos modificados se confirman juntos
+        if archivos:
+            escribir_json_lote({ruta: self._contenido(coleccion, registros)
+                                for ruta, (coleccion, registros) in archivos.items()}, indent=4)
+
+    @staticmethod
+    def _contenido(coleccion, registros):
+        if coleccion != "prestamos":
+            return list(registros.values())
+        # prestamos.json agrupa los préstamos por usuario
+        prestamos = defaultdict(list)
+        for id_usuario, registro in registros.values():
+            prestamos[id_usuario].append(registro)
+        return prestamos
+
+    def devolver_instantanea(self, instantanea):
+        # Los eventos ya escritos en el historial no vuelven a quedar pendientes
+        _, historial, colecciones = instantanea
+        self._historial_pendiente[:0] = historial
+        self._sucios.update(colecciones)
+
+    # ----------------------------
+    # Operaciones: devuelven el objeto afectado o lanzan ErrorBiblioteca.
+    # Nada se imprime aquí; de eso se encarga el menú.
+    # ----------------------------
     def agregar_libro(self, libro):
-        if libro.isbn not in self.libros:
-            self.libros[libro.isbn] = libro
-            print(f"✅ Libro agregado: {libro}")
-        else:
-            print("⚠️ El libro ya está registrado.")
+        if libro.isbn in self.libros:
+            raise LibroDuplicado(libro.isbn)
+        self.libros[libro.isbn] = libro
+        self.disponibles[libro.isbn] = None
+        if self._indice_textual is not None:
+            self._indice_textual.agregar(libro)
+        self._ordenar_alta("libros", libro.titulo, libro.isbn)
+        self._marcar("libros", libro.isbn)
+        return libro
 
     def registrar_usuario(self, usuario):
-        if usuario.id_usuario not in self.usuarios:
-            self.usuarios[usuario.id_usuario] = usuario
-            print(f"✅ Usuario registrado: {usuario}")
-        else:
-            print("⚠️ ID de usuario ya existente.")
+        if usuario.id_usuario in self.usuarios:
+            raise UsuarioDuplicado(usuario.id_usuario)
+        self.usuarios[usuario.id_usuario] = usuario
+        self._ordenar_alta("usuarios", usuario.nombre, usuario.id_usuario)
+        self._marcar("usuarios", usuario.id_usuario)
+        return usuario
 
-    def prestar_libro(self, id_usuario, isbn):
+    def _comprobar_prestamo(self, id_usuario, isbn):
         if id_usuario not in self.usuarios:
-            print("⚠️ Usuario no registrado.")
-            return
+            raise UsuarioNoRegistrado(id_usuario)
         if isbn not in self.libros:
-            print("⚠️ Libro no encontrado.")
-            return
+            raise LibroNoEncontrado(isbn)
+        if isbn in self.prestamos:
+            raise LibroYaPrestado(isbn)
 
-        # Verificar si el libro ya está prestado
-        for usuario in self.usuarios.values():
-            for libro in usuario.libros_prestados:
-                if libro.isbn == isbn:
-                    print("⚠️ El libro ya está prestado.")
-                    return
+    @staticmethod
+    def _comprobar_dias(dias):
+        if dias is not None and (isinstance(dias, bool) or not isinstance(dias, int) or dias <= 0):
+            raise DiasPrestamoInvalidos(dias)
 
-        usuario = self.usuarios[id_usuario]
-        libro = self.libros[isbn]
-        usuario.libros_prestados.append(libro)
-        print(f"📚 Libro prestado: {libro} ➡️ a {usuario.nombre}")
+    def _comprobar_devolucion(self, id_usuario, isbn):
+        if id_usuario not in self.usuarios:
+            raise UsuarioNoRegistrado(id_usuario)
+        prestamo = self.prestamos.get(isbn)
+        if prestamo is None or prestamo.id_usuario != id_usuario:
+            raise LibroNoPrestado(id_usuario, isbn)
+
+    def prestar_libro(self, id_usuario, isbn, dias=None):
+        """Presta el libro y devuelve el Prestamo creado."""
+        self._comprobar_dias(dias)
+        self._comprobar_prestamo(id_usuario, isbn)
+        return self._registrar_prestamo(self.usuarios[id_usuario], self.libros[isbn], dias=dias)
 
     def devolver_libro(self, id_usuario, isbn):
-        if id_usuario not in self.usuarios:
-            print("⚠️ Usuario no registrado.")
-            return
+        """Registra la devolución y devuelve el Prestamo cerrado."""
+        self._comprobar_devolucion(id_usuario, isbn)
+        return self._registrar_devolucion(self.usuarios[id_usuario], self.libros[isbn])
 
-        usuario = self.usuarios[id_usuario]
-        for libro in usuario.libros_prestados:
-            if libro.isbn == isbn:
-                usuario.libros_prestados.remove(libro)
-                print(f"🔄 Libro devuelto: {libro} por {usuario.nombre}")
-                return
-        print("⚠️ El usuario no tiene prestado ese libro.")
+    # ----------------------------
+    # Operaciones en lote (quioscos de autopréstamo, buzón de devoluciones)
+    # ----------------------------
+    def _validar_lote(self, pares, comprobar, error_repetido):
+        """Valida los pares (id_usuario, isbn) contra los índices y entre sí."""
+        resultados, en_lote = [], set()
+        for id_usuario, isbn in pares:
+            resultado = ResultadoLote(id_usuario, isbn)
+            try:
+                comprobar(id_usuario, isbn)
+                # Un mismo libro no puede aparecer dos veces en el lote
+                if isbn in en_lote:
+                    raise error_repetido(id_usuario, isbn)
+                en_lote.add(isbn)
+            except ErrorBiblioteca as e:
+                resultado.error = e
+            resultados.append(resultado)
+        return resultados
 
-    def buscar_libro(self, **kwargs):
-        resultados = []
-        for libro in self.libros.values():
-            if ("titulo" in kwargs and kwargs["titulo"].lower() in libro.titulo.lower()) \
-               or ("autor" in kwargs and kwargs["autor"].lower() in libro.autor.lower()) \
-               or ("categoria" in kwargs and kwargs["categoria"].lower() in libro.categoria.lower()):
-                resultados.append(libro)
-
-        if resultados:
-            print("🔍 Libros encontrados:")
-            for l in resultados:
-                print(f"   {l}")
-        else:
-            print("⚠️ No se encontraron coincidencias.")
+    def _validar_prestamos(self, pares):
+        return self._validar_lote(pares, self._comprobar_prestamo, lambda _, isbn: LibroYaPrestado(isbn))
+
+    def _validar_devoluciones(self, pares):
+        return self._validar_lote(pares, self._comprobar_devolucion, LibroNoPrestado)
+
+    def _aplicar_lote(self, resultados, todo_o_nada, aplicar, guardar):
+        # Primero se valida todo; solo después se modifica el estado, así que
+        # con todo_o_nada=True un rechazo deja la biblioteca intacta.
+        if todo_o_nada and not all(r.ok for r in resultados):
+            for r in resultados:
+                if r.ok:
+                    r.error = LoteCancelado()
+            return resultados
+        for r in resultados:
+            if r.ok:
+                aplicar(self.usuarios[r.id_usuario], self.libros[r.isbn])
+        if guardar:
+            self.guardar_datos(forzar=True)  # un único guardado para todo el lote
+        return resultados
+
+    def prestar_lote(self, pares, dias=None, todo_o_nada=False, ahora=None, guardar=True):
+        """Presta varios libros de una vez y devuelve un ResultadoLote por par.
+
+        Con guardar=False el llamador se encarga de persistir los cambios.
+        """
+        self._comprobar_dias(dias)
+        ahora = ahora or datetime.now()
+        return self._aplicar_lote(self._validar_prestamos(pares), todo_o_nada,
+                                  lambda usuario, libro: self._registrar_prestamo(usuario, libro, ahora, dias),
+                                  guardar)
+
+    def devolver_lote(self, pares, todo_o_nada=False, ahora=None, guardar=True):
+        """Devuelve varios libros de una vez y devuelve un ResultadoLote por par."""
+        ahora = ahora or datetime.now()
+        return self._aplicar_lote(self._validar_devoluciones(pares), todo_o_nada,
+                                  lambda usuario, libro: self._registrar_devolucion(usuario, libro, ahora),
+                                  guardar)
+
+    def esta_disponible(self, isbn):
+        return isbn in self.disponibles
+
+    def quien_tiene(self, isbn):
+        """Devuelve el Usuario que tiene prestado el libro, o None."""
+        prestamo = self.prestamos.get(isbn)
+        return self.usuarios[prestamo.id_usuario] if prestamo is not None else None
+
+    def libros_disponibles(self):
+        return [self.libros[isbn] for isbn in self.disponibles]
+
+    def buscar_libro(self, todos=False, limite=None, **kwargs):
+        """Busca por titulo, autor y/o categoria, sin distinguir tildes ni mayúsculas.
+
+        Cada palabra coincide también como prefijo ("quij" encuentra "Quijote").
+        Devuelve los libros ordenados por relevancia.
+        """
+        criterios = {campo: texto for campo, texto in kwargs.items() if texto.strip()}
+        return [self.libros[isbn] for isbn, _ in self.indice.buscar(criterios, todos, limite)]
 
     def listar_todos_prestados(self):
-        encontrados = False
-        for usuario in self.usuarios.values():
-            for libro in usuario.libros_prestados:
-                print(f"📖 {libro} ➡️ prestado a {usuario.nombre}")
-                encontrados = True
-        if not encontrados:
-            print("ℹ️ No hay libros prestados actualmente.")
+        """Generador de pares (libro, usuario) de los libros prestados, por título."""
+        return self._recorrer(self.pagina_prestados)
 
-    def listar_todos_usuarios_y_libros(self):
-        print("👥 Usuarios registrados:")
-        for usuario in self.usuarios.values():
-            print(f"   {usuario}")
+    def listar_usuarios(self):
+        return self._recorrer(self.pagina_usuarios)
 
-        print("\n📚 Libros disponibles:")
-        prestados = {libro.isbn for u in self.usuarios.values() for libro in u.libros_prestados}
-        for libro in self.libros.values():
-            if libro.isbn not in prestados:
-                print(f"   {libro}")
+    def listar_libros_disponibles(self):
+        return self._recorrer(lambda cursor, tam: self.pagina_libros(cursor, tam, solo_disponibles=True))
+
+    def listar_todos_usuarios_y_libros(self):
+        """Devuelve dos generadores: usuarios por nombre y libros disponibles por título."""
+        return self.listar_usuarios(), self.listar_libros_disponibles()
 
 # ==============================
 # Menú interactivo
 # ==============================
 if __name__ == "__main__":
-    biblioteca = Biblioteca()
+    biblioteca = Biblioteca(perezosa=True, ventana_guardado=2)
+    # Los cambios aún dentro de la ventana de guardado no se pierden con
+    # Ctrl+C ni con un error inesperado: se confirman al terminar el proceso
+    atexit.register(biblioteca.guardar_datos, forzar=True)
+
+    def mostrar_paginado(elementos, formato, tam_pagina=20):
+        """Imprime de tam_pagina en tam_pagina; devuelve cuántos se mostraron."""
+        n = 0
+        for n, elemento in enumerate(elementos, 1):
+            if n > 1 and (n - 1) % tam_pagina == 0:
+                if input("-- Enter: más resultados, q: terminar -- ").strip().lower() == "q":
+                    break
+            print(formato(elemento))
+        return n
+
+    def ejecutar(operacion, *args):
+        """Llama a una operación de la biblioteca y muestra el error si lo hay.
+
+        El bloqueo evita que el guardado diferido copie un cambio a medias.
+        """
+        try:
+            with biblioteca.bloqueo:
+                return operacion(*args)
+        except ErrorBiblioteca as e:
+            print(f"⚠️ {e}")
+            return None
 
     while True:
         print("\n📚 MENÚ BIBLIOTECA")
@@ -204,7 +982,8 @@ if __name__ == "__main__":
         print("5. Buscar libro")
         print("6. Listar libros prestados")
         print("7. Listar usuarios y libros")
-        print("8. Salir")
+        print("8. Ver préstamos vencidos")
+        print("9. Salir")
 
         opcion = input("Selecciona una opción: ").strip()
 
@@ -213,43 +992,70 @@ if __name__ == "__main__":
             autor = input("Autor: ")
             categoria = input("Categoría: ")
             isbn = input("ISBN: ")
-            libro = Libro(titulo, autor, categoria, isbn)
-            biblioteca.agregar_libro(libro)
-            biblioteca.guardar_datos()
+            libro = ejecutar(biblioteca.agregar_libro, Libro(titulo, autor, categoria, isbn))
+            if libro:
+                print(f"✅ Libro agregado: {libro}")
+                biblioteca.guardar_datos()
 
         elif opcion == "2":
             nombre = input("Nombre de usuario: ")
             id_usuario = input("ID de usuario: ")
-            usuario = Usuario(nombre, id_usuario)
-            biblioteca.registrar_usuario(usuario)
-            biblioteca.guardar_datos()
+            usuario = ejecutar(biblioteca.registrar_usuario, Usuario(nombre, id_usuario))
+            if usuario:
+                print(f"✅ Usuario registrado: {usuario}")
+                biblioteca.guardar_datos()
 
         elif opcion == "3":
             id_usuario = input("ID de usuario: ")
             isbn = input("ISBN del libro a prestar: ")
-            biblioteca.prestar_libro(id_usuario, isbn)
-            biblioteca.guardar_datos()
+            if ejecutar(biblioteca.prestar_libro, id_usuario, isbn):
+                print(f"📚 Libro prestado: {biblioteca.libros[isbn]} ➡️ a {biblioteca.usuarios[id_usuario].nombre}")
+                biblioteca.guardar_datos()
 
         elif opcion == "4":
             id_usuario = input("ID de usuario: ")
             isbn = input("ISBN del libro a devolver: ")
-            biblioteca.devolver_libro(id_usuario, isbn)
-            biblioteca.guardar_datos()
+            if ejecutar(biblioteca.devolver_libro, id_usuario, isbn):
+                print(f"🔄 Libro devuelto: {biblioteca.libros[isbn]} por {biblioteca.usuarios[id_usuario].nombre}")
+                biblioteca.guardar_datos()
 
         elif opcion == "5":
-            criterio = input("Buscar por (titulo/autor/categoria): ").lower()
-            valor = input(f"Ingrese {criterio}: ")
-            biblioteca.buscar_libro(**{criterio: valor})
+            print("Deja en blanco los campos que no quieras usar.")
+            criterios = {campo: input(f"{campo.capitalize()}: ") for campo in CAMPOS_BUSQUEDA}
+            todos = input("¿Deben coincidir todos los campos? (s/n): ").strip().lower() == "s"
+            resultados = biblioteca.buscar_libro(todos=todos, **criterios)
+            if resultados:
+                print("🔍 Libros encontrados:")
+                for l in resultados:
+                    print(f"   {l}")
+            else:
+                print("⚠️ No se encontraron coincidencias.")
 
         elif opcion == "6":
-            biblioteca.listar_todos_prestados()
+            if not mostrar_paginado(biblioteca.listar_todos_prestados(),
+                                    lambda par: f"📖 {par[0]} ➡️ prestado a {par[1].nombre}"):
+                print("ℹ️ No hay libros prestados actualmente.")
 
         elif opcion == "7":
-            biblioteca.listar_todos_usuarios_y_libros()
+            usuarios, disponibles = biblioteca.listar_todos_usuarios_y_libros()
+            print("👥 Usuarios registrados:")
+            mostrar_paginado(usuarios, lambda usuario: f"   {usuario}")
+            print("\n📚 Libros disponibles:")
+            mostrar_paginado(disponibles, lambda libro: f"   {libro}")
 
         elif opcion == "8":
+            vencidos = biblioteca.vencidos()
+            if vencidos:
+                print(f"⏰ {len(vencidos)} préstamos vencidos:")
+                for prestamo in vencidos:
+                    print(f"   {biblioteca.libros[prestamo.isbn]} ➡️ {biblioteca.usuarios[prestamo.id_usuario].nombre}"
+                          f" | venció el {prestamo.fecha_vencimiento:%Y-%m-%d}")
+            else:
+                print("✅ No hay préstamos vencidos.")
+
+        elif opcion == "9":
             print("💾 Guardando y saliendo...")
-            biblioteca.guardar_datos()
+            biblioteca.guardar_datos(forzar=True)
             break
 
         else:
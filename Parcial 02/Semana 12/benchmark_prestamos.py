@@ -0,0 +1,76 @@
+# ==============================
+# Benchmark: índice de préstamos vs. recorrido de todos los usuarios
+# ==============================
+# Uso: python benchmark_prestamos.py [usuarios] [libros]   (por defecto 100000 1000000)
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from Sistema_de_gestion_de_biblioteca_digital import Biblioteca, Libro, Usuario
+
+
+def crear_biblioteca(n_usuarios, n_libros, prestamos_por_usuario=3):
+    os.chdir(tempfile.mkdtemp())  # Biblioteca lee los JSON del directorio actual
+    biblioteca = Biblioteca()
+    for i in range(n_libros):
+        biblioteca.agregar_libro(Libro(f"Libro {i}", "Autor", "General", f"ISBN{i}"))
+    for u in range(n_usuarios):
+        biblioteca.registrar_usuario(Usuario(f"Usuario {u}", f"U{u}"))
+        for k in range(prestamos_por_usuario):
+            biblioteca.prestar_libro(f"U{u}", f"ISBN{(u * prestamos_por_usuario + k) % n_libros}")
+    return biblioteca
+
+
+# Algoritmos anteriores
+def prestado_lineal(biblioteca, isbn):
+    for usuario in biblioteca.usuarios.values():
+        for libro in usuario.libros_prestados:
+            if libro.isbn == isbn:
+                return True
+    return False
+
+
+def disponibles_lineal(biblioteca):
+    prestados = {libro.isbn for u in biblioteca.usuarios.values() for libro in u.libros_prestados}
+    return [libro for libro in biblioteca.libros.values() if libro.isbn not in prestados]
+
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    n_usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_libros = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    print(f"Creando biblioteca con {n_usuarios} usuarios y {n_libros} libros...")
+    biblioteca = crear_biblioteca(n_usuarios, n_libros)
+    print(f"{len(biblioteca.prestamos)} préstamos activos\n")
+
+    rnd = random.Random(1)
+    consultas = [f"ISBN{rnd.randrange(n_libros)}" for _ in range(20)]
+    for isbn in consultas:
+        assert prestado_lineal(biblioteca, isbn) == (not biblioteca.esta_disponible(isbn))
+    # Búsqueda con todos los criterios vacíos (menú opción 5, GET /libros/buscar?todos=1)
+    assert biblioteca.buscar_libro(todos=True, titulo="", autor=" ", categoria="") == []
+    assert biblioteca.buscar_libro(titulo="", autor="", categoria="") == []
+
+    print(f"{'Operación':<32} {'Antes ms':>10} {'Índice ms':>11}")
+    print("-" * 55)
+    antes = medir(lambda: [prestado_lineal(biblioteca, i) for i in consultas], 1) / len(consultas)
+    ahora = medir(lambda: [biblioteca.esta_disponible(i) for i in consultas], 1000) / len(consultas)
+    print(f"{'¿Está prestado? (por consulta)':<32} {antes:>10.3f} {ahora:>11.5f}")
+    ahora = medir(lambda: [biblioteca.quien_tiene(i) for i in consultas], 1000) / len(consultas)
+    print(f"{'¿Quién lo tiene? (por consulta)':<32} {antes:>10.3f} {ahora:>11.5f}")
+    antes = medir(lambda: disponibles_lineal(biblioteca), 1)
+    ahora = medir(biblioteca.libros_disponibles, 1)
+    print(f"{'Listado de disponibles':<32} {antes:>10.1f} {ahora:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# ==============================
+# Prueba de carga del servicio HTTP de la biblioteca
+# ==============================
+# Abre varias conexiones keep-alive contra localhost y mezcla búsquedas
+# (lecturas) con préstamos y devoluciones (escrituras). Informa de
+# peticiones por segundo y de la latencia p50/p99 por tipo de petición.
+#
+# Uso: python carga_http.py [--conexiones 50] [--duracion 10] [--escrituras 0.2]
+#                           [--lanzar LIBROS]   (arranca el servicio con datos generados)
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+SILABAS = ["ca", "me", "ri", "lo", "sa", "ve", "ni", "to", "mar", "pe", "lu", "dro", "si", "an", "ga", "ben"]
+# Vocabulario sintético de unas 4000 palabras, para que cada término aparezca
+# en una fracción realista de los títulos
+PALABRAS = [a + b + c for a in SILABAS for b in SILABAS for c in SILABAS]
+AUTORES = ["Garcia", "Borges", "Allende", "Cortazar", "Neruda", "Rulfo", "Mistral", "Paz"]
+CATEGORIAS = ["Novela", "Poesia", "Ensayo", "Cuento", "Historia", "Ciencia Ficcion"]
+
+
+class Cliente:
+    """Conexión HTTP/1.1 persistente mínima."""
+
+    def __init__(self, host, puerto):
+        self.host, self.puerto = host, puerto
+
+    async def abrir(self):
+        self.lector, self.escritor = await asyncio.open_connection(self.host, self.puerto)
+
+    async def pedir(self, metodo, ruta, datos=None):
+        cuerpo = json.dumps(datos).encode("utf-8") if datos is not None else b""
+        self.escritor.write(f"{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\n"
+                            f"Content-Length: {len(cuerpo)}\r\n\r\n".encode("latin-1") + cuerpo)
+        await self.escritor.drain()
+        estado = int((await self.lector.readline()).split()[1])
+        longitud = 0
+        while (linea := await self.lector.readline()) not in (b"\r\n", b""):
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            if nombre.lower() == "content-length":
+                longitud = int(valor)
+        return estado, json.loads(await self.lector.readexactly(longitud))
+
+    def cerrar(self):
+        self.escritor.close()
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else float("nan")
+
+
+def generar_datos(directorio, n_libros, n_usuarios):
+    rnd = random.Random(1)
+    libros = [{"titulo": " ".join(rnd.choice(PALABRAS) for _ in range(3)).capitalize(),
+               "autor": rnd.choice(AUTORES), "categoria": rnd.choice(CATEGORIAS), "isbn": f"ISBN{i}"}
+              for i in range(n_libros)]
+    usuarios = [{"nombre": f"Usuario {u}", "id_usuario": f"U{u}", "libros_prestados": []}
+                for u in range(n_usuarios)]
+    for nombre, datos in (("libros.json", libros), ("usuarios.json", usuarios), ("prestamos.json", {})):
+        with open(os.path.join(directorio, nombre), "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+
+
+async def esperar_servicio(host, puerto, segundos=60):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        try:
+            _, escritor = await asyncio.open_connection(host, puerto)
+            escritor.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise SystemExit("❌ El servicio no respondió a tiempo")
+
+
+async def trabajador(cliente, id_usuario, isbns, consultas, fin, fraccion_escrituras, rnd, medidas):
+    prestados = []
+    while time.monotonic() < fin:
+        if rnd.random() < fraccion_escrituras and (isbns or prestados):
+            # Alterna préstamos y devoluciones para no agotar los libros del trabajador
+            if prestados and (not isbns or rnd.random() < 0.5):
+                isbn = prestados.pop()
+                tipo, ruta, datos = "devolucion", "/devoluciones", {"id_usuario": id_usuario, "isbn": isbn}
+                isbns.append(isbn)
+            else:
+                isbn = isbns.pop()
+                tipo, ruta, datos = "prestamo", "/prestamos", {"id_usuario": id_usuario, "isbn": isbn}
+                prestados.append(isbn)
+            metodo = "POST"
+        else:
+            ruta = f"/libros/buscar?titulo={quote(rnd.choice(consultas))}&limite=20"
+            tipo, metodo, datos = "busqueda", "GET", None
+
+        inicio = time.perf_counter()
+        estado, _ = await cliente.pedir(metodo, ruta, datos)
+        medidas.setdefault(tipo, []).append(time.perf_counter() - inicio)
+        if estado >= 400:
+            medidas.setdefault("errores", []).append(estado)
+
+
+async def ejecutar(args):
+    clientes = [Cliente(args.host, args.puerto) for _ in range(args.conexiones)]
+    for cliente in clientes:
+        await cliente.abrir()
+
+    # Cada trabajador usa un usuario y un grupo de libros propios, así sus
+    # escrituras no chocan con las de los demás
+    _, usuarios = await clientes[0].pedir("GET", f"/usuarios?limite={args.conexiones}")
+    _, libros = await clientes[0].pedir("GET", f"/libros/disponibles?limite={args.conexiones * 10}")
+    usuarios, libros = usuarios["elementos"], libros["elementos"]
+    if len(usuarios) < args.conexiones:
+        raise SystemExit(f"❌ Hacen falta al menos {args.conexiones} usuarios registrados")
+    consultas = sorted({palabra for libro in libros for palabra in libro["titulo"].split()}) or PALABRAS
+
+    medidas = {}
+    inicio = time.monotonic()
+    fin = inicio + args.duracion
+    await asyncio.gather(*(
+        trabajador(cliente, usuarios[c]["id_usuario"], [l["isbn"] for l in libros[c::args.conexiones]],
+                   consultas, fin, args.escrituras, random.Random(c), medidas)
+        for c, cliente in enumerate(clientes)))
+    segundos = time.monotonic() - inicio
+    for cliente in clientes:
+        cliente.cerrar()
+
+    total = sum(len(v) for k, v in medidas.items() if k != "errores")
+    print(f"\n{total} peticiones en {segundos:.1f} s con {args.conexiones} conexiones: "
+          f"{total / segundos:,.0f} peticiones/s")
+    print(f"{'Tipo':<12} {'Peticiones':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    print("-" * 43)
+    todas = []
+    for tipo in ("busqueda", "prestamo", "devolucion"):
+        valores = medidas.get(tipo, [])
+        todas += valores
+        print(f"{tipo:<12} {len(valores):>10} {percentil(valores, 0.5) * 1000:>9.2f} "
+              f"{percentil(valores, 0.99) * 1000:>9.2f}")
+    print(f"{'total':<12} {len(todas):>10} {percentil(todas, 0.5) * 1000:>9.2f} {percentil(todas, 0.99) * 1000:>9.2f}")
+    if medidas.get("errores"):
+        print(f"⚠ {len(medidas['errores'])} respuestas con error")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio HTTP de la biblioteca.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--conexiones", type=int, default=50)
+    parser.add_argument("--duracion", type=float, default=10, help="segundos de carga")
+    parser.add_argument("--escrituras", type=float, default=0.2, help="fracción de préstamos/devoluciones")
+    parser.add_argument("--lanzar", type=int, metavar="LIBROS",
+                        help="arranca el servicio en una carpeta temporal con LIBROS libros generados")
+    args = parser.parse_args()
+
+    servicio = None
+    if args.lanzar:
+        directorio = tempfile.mkdtemp()
+        generar_datos(directorio, args.lanzar, max(args.conexiones, args.lanzar // 10))
+        servicio = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  "servicio_http.py"),
+                                     "--host", args.host, "--puerto", str(args.puerto), "--directorio", directorio])
+    try:
+        asyncio.run(esperar_servicio(args.host, args.puerto))
+        asyncio.run(ejecutar(args))
+    finally:
+        if servicio:
+            servicio.terminate()
+            servicio.wait()
+
+
+if __name__ == "__main__":
+    main()
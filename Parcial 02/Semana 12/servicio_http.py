@@ -0,0 +1,375 @@
+# ==============================
+# Servicio HTTP/JSON para la biblioteca digital
+# ==============================
+# Expone una única Biblioteca en memoria mediante asyncio (solo biblioteca
+# estándar). Las lecturas se atienden directamente en el bucle de eventos;
+# las escrituras pasan por una sola tarea escritora que las aplica en orden
+# y guarda en disco en un hilo aparte, agrupando todas las que llegaron
+# mientras se guardaba el lote anterior.
+#
+# Uso: python servicio_http.py [--host 127.0.0.1] [--puerto 8000] [--directorio .]
+#
+# Rutas:
+#   GET  /libros/buscar?titulo=&autor=&categoria=&todos=1&limite=20
+#   GET  /libros/disponibles?cursor=&limite=50   (los listados se paginan:
+#   GET  /usuarios?cursor=&limite=50              {"elementos": [...], "siguiente": cursor})
+#   GET  /prestamos?cursor=&limite=50
+#   GET  /prestamos/vencidos?limite=N
+#   POST /prestamos        {"id_usuario": ..., "isbn": ..., "dias": 14}
+#   POST /devoluciones     {"id_usuario": ..., "isbn": ...}
+#   POST /prestamos/lote   {"pares": [[id_usuario, isbn], ...], "todo_o_nada": false}
+#   POST /devoluciones/lote (mismo formato)
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+from urllib.parse import parse_qs, urlsplit
+
+from Sistema_de_gestion_de_biblioteca_digital import (
+    CAMPOS_BUSQUEDA, Biblioteca, DiasPrestamoInvalidos, ErrorBiblioteca, LibroNoEncontrado,
+    UsuarioNoRegistrado)
+
+ESTADOS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+MAX_CUERPO = 1 << 20
+TAM_PAGINA = 50
+REINTENTO_GUARDADO = 5.0  # segundos hasta reintentar un guardado fallido
+
+
+class ErrorPeticion(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def prestamo_a_dict(prestamo):
+    return {"id_usuario": prestamo.id_usuario, **prestamo.to_dict()}
+
+
+def resultado_a_dict(resultado):
+    return {"id_usuario": resultado.id_usuario, "isbn": resultado.isbn, "ok": resultado.ok,
+            "error": type(resultado.error).__name__ if resultado.error else None,
+            "mensaje": resultado.motivo}
+
+
+def error_a_respuesta(error):
+    if isinstance(error, DiasPrestamoInvalidos):
+        estado = 400
+    elif isinstance(error, (UsuarioNoRegistrado, LibroNoEncontrado)):
+        estado = 404
+    else:
+        estado = 409
+    return estado, {"error": type(error).__name__, "mensaje": str(error)}
+
+
+# ==============================
+# Escritor único
+# ==============================
+class Escritor:
+    """Aplica las escrituras de una en una y las persiste por grupos.
+
+    Cada petición espera hasta que su cambio está en disco. Mientras un
+    grupo se guarda (en un hilo), las nuevas escrituras se acumulan en la
+    cola y se aplican todas juntas en la siguiente vuelta.
+
+    La copia que se guarda se toma en el bucle de eventos, pero solo
+    serializa los elementos que cambiaron; los archivos completos se arman y
+    codifican en el hilo de guardado, que nunca toca los objetos de la
+    biblioteca. Si el guardado falla,
+    los cambios (ya aplicados en memoria) siguen pendientes, cada petición
+    recibe igualmente su resultado y se reintenta con el siguiente grupo o
+    pasados REINTENTO_GUARDADO segundos.
+    """
+
+    def __init__(self, biblioteca):
+        self.biblioteca = biblioteca
+        self.cola = asyncio.Queue()
+        self.tarea = None
+        self.guardado = None  # tarea del último guardado lanzado al hilo de E/S
+
+    def iniciar(self):
+        self.tarea = asyncio.create_task(self._bucle())
+
+    async def ejecutar(self, operacion, *args, **kwargs):
+        futuro = asyncio.get_running_loop().create_future()
+        await self.cola.put((operacion, args, kwargs, futuro))
+        return await futuro
+
+    async def _bucle(self):
+        while True:
+            if self.biblioteca.hay_cambios():
+                # Queda un guardado fallido: se reintenta aunque no lleguen escrituras
+                try:
+                    grupo = [await asyncio.wait_for(self.cola.get(), REINTENTO_GUARDADO)]
+                except asyncio.TimeoutError:
+                    grupo = []
+            else:
+                grupo = [await self.cola.get()]
+            while not self.cola.empty():
+                grupo.append(self.cola.get_nowait())
+
+            respuestas = []
+            for operacion, args, kwargs, futuro in grupo:
+                try:
+                    respuestas.append((futuro, operacion(*args, **kwargs), None))
+                except Exception as e:  # ErrorBiblioteca u otro: se entrega a quien llamó
+                    respuestas.append((futuro, None, e))
+
+            # Las lecturas siguen atendiéndose mientras se escribe en disco
+            await self._guardar()
+
+            for futuro, valor, error in respuestas:
+                if futuro.cancelled():
+                    continue
+                if error:
+                    futuro.set_exception(error)
+                else:
+                    futuro.set_result(valor)
+
+    async def _guardar(self):
+        if not self.biblioteca.hay_cambios():
+            return
+        try:
+            instantanea = self.biblioteca.tomar_instantanea()
+        except Exception as e:  # el bucle debe seguir vivo pase lo que pase
+            print(f"⚠ No se pudo preparar el guardado ({type(e).__name__}: {e}); se reintentará.", flush=True)
+            return
+        self.guardado = asyncio.ensure_future(self._escribir(instantanea))
+        # shield: si se cancela el escritor, cerrar() espera a este mismo guardado
+        await asyncio.shield(self.guardado)
+
+    async def _escribir(self, instantanea):
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.biblioteca.escribir_instantanea, instantanea)
+        except Exception as e:  # disco lleno, permisos...
+            self.biblioteca.devolver_instantanea(instantanea)
+            print(f"⚠ No se pudo guardar ({type(e).__name__}: {e}); se reintentará.", flush=True)
+
+    async def cerrar(self):
+        if self.tarea:
+            self.tarea.cancel()
+            try:
+                await self.tarea
+            except asyncio.CancelledError:
+                pass
+        # Un guardado ya lanzado termina antes de escribir de nuevo los mismos .tmp
+        if self.guardado is not None:
+            await self.guardado
+        self.biblioteca.guardar_datos(forzar=True)
+
+
+# ==============================
+# Servicio
+# ==============================
+class ServicioBiblioteca:
+    def __init__(self, biblioteca):
+        self.biblioteca = biblioteca
+        self.escritor = Escritor(biblioteca)
+        self.rutas = {
+            ("GET", "/libros/buscar"): self.buscar,
+            ("GET", "/libros/disponibles"): self.disponibles,
+            ("GET", "/usuarios"): self.usuarios,
+            ("GET", "/prestamos"): self.prestamos,
+            ("GET", "/prestamos/vencidos"): self.vencidos,
+            ("POST", "/prestamos"): self.prestar,
+            ("POST", "/devoluciones"): self.devolver,
+            ("POST", "/prestamos/lote"): self.prestar_lote,
+            ("POST", "/devoluciones/lote"): self.devolver_lote,
+        }
+
+    # ----------------------------
+    # Lecturas
+    # ----------------------------
+    @staticmethod
+    def _limite(consulta):
+        try:
+            return int(consulta["limite"]) if "limite" in consulta else None
+        except ValueError:
+            raise ErrorPeticion(400, "limite debe ser un número entero")
+
+    async def buscar(self, consulta, _):
+        criterios = {campo: consulta.get(campo, "") for campo in CAMPOS_BUSQUEDA}
+        libros = self.biblioteca.buscar_libro(todos=consulta.get("todos") in ("1", "s", "true"),
+                                              limite=self._limite(consulta), **criterios)
+        return 200, [libro.to_dict() for libro in libros]
+
+    def _paginar(self, pedir_pagina, consulta, convertir):
+        limite = self._limite(consulta) or TAM_PAGINA
+        if limite < 1:
+            raise ErrorPeticion(400, "limite debe ser mayor que cero")
+        pagina = pedir_pagina(consulta.get("cursor"), limite)
+        return 200, {"elementos": [convertir(e) for e in pagina.elementos], "siguiente": pagina.siguiente}
+
+    async def disponibles(self, consulta, _):
+        return self._paginar(lambda cursor, tam: self.biblioteca.pagina_libros(cursor, tam, solo_disponibles=True),
+                             consulta, lambda libro: libro.to_dict())
+
+    async def usuarios(self, consulta, _):
+        return self._paginar(self.biblioteca.pagina_usuarios, consulta, lambda usuario: usuario.to_dict())
+
+    async def prestamos(self, consulta, _):
+        return self._paginar(self.biblioteca.pagina_prestados, consulta,
+                             lambda par: prestamo_a_dict(self.biblioteca.prestamos[par[0].isbn]))
+
+    async def vencidos(self, consulta, _):
+        limite = self._limite(consulta)
+        vencidos = self.biblioteca.vencidos() if limite is None else self.biblioteca.proximos_vencidos(limite)
+        return 200, [prestamo_a_dict(p) for p in vencidos]
+
+    # ----------------------------
+    # Escrituras (siempre a través del escritor)
+    # ----------------------------
+    @staticmethod
+    def _campos(cuerpo, *nombres):
+        if not isinstance(cuerpo, dict) or any(not isinstance(cuerpo.get(n), str) for n in nombres):
+            raise ErrorPeticion(400, f"Se esperaba un objeto JSON con {', '.join(nombres)}")
+        return [cuerpo[n] for n in nombres]
+
+    @staticmethod
+    def _pares(cuerpo):
+        pares = cuerpo.get("pares") if isinstance(cuerpo, dict) else None
+        if not isinstance(pares, list) or not all(
+                isinstance(p, list) and len(p) == 2 and all(isinstance(x, str) for x in p) for p in pares):
+            raise ErrorPeticion(400, "Se esperaba {\"pares\": [[id_usuario, isbn], ...]} con textos")
+        return [tuple(p) for p in pares], bool(cuerpo.get("todo_o_nada"))
+
+    async def prestar(self, _, cuerpo):
+        id_usuario, isbn = self._campos(cuerpo, "id_usuario", "isbn")
+        prestamo = await self.escritor.ejecutar(self.biblioteca.prestar_libro, id_usuario, isbn,
+                                                cuerpo.get("dias"))
+        return 201, prestamo_a_dict(prestamo)
+
+    async def devolver(self, _, cuerpo):
+        id_usuario, isbn = self._campos(cuerpo, "id_usuario", "isbn")
+        prestamo = await self.escritor.ejecutar(self.biblioteca.devolver_libro, id_usuario, isbn)
+        return 200, prestamo_a_dict(prestamo)
+
+    async def prestar_lote(self, _, cuerpo):
+        pares, todo_o_nada = self._pares(cuerpo)
+        # El guardado lo hace el escritor, fuera del bucle de eventos
+        resultados = await self.escritor.ejecutar(self.biblioteca.prestar_lote, pares,
+                                                  todo_o_nada=todo_o_nada, guardar=False)
+        return 200, [resultado_a_dict(r) for r in resultados]
+
+    async def devolver_lote(self, _, cuerpo):
+        pares, todo_o_nada = self._pares(cuerpo)
+        resultados = await self.escritor.ejecutar(self.biblioteca.devolver_lote, pares,
+                                                  todo_o_nada=todo_o_nada, guardar=False)
+        return 200, [resultado_a_dict(r) for r in resultados]
+
+    # ----------------------------
+    # HTTP
+    # ----------------------------
+    async def despachar(self, metodo, ruta, cuerpo_crudo):
+        partes = urlsplit(ruta)
+        manejador = self.rutas.get((metodo, partes.path.rstrip("/") or "/"))
+        if manejador is None:
+            if any(r == partes.path for _, r in self.rutas):
+                return 405, {"error": "MetodoNoPermitido", "mensaje": f"{metodo} no admitido en {partes.path}"}
+            return 404, {"error": "RutaNoEncontrada", "mensaje": partes.path}
+        consulta = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+        try:
+            cuerpo = json.loads(cuerpo_crudo) if cuerpo_crudo else None
+            return await manejador(consulta, cuerpo)
+        except json.JSONDecodeError as e:
+            return 400, {"error": "JSONInvalido", "mensaje": str(e)}
+        except ErrorPeticion as e:
+            return e.estado, {"error": "PeticionInvalida", "mensaje": str(e)}
+        except ErrorBiblioteca as e:
+            return error_a_respuesta(e)
+
+    async def atender(self, lector, escritor):
+        """Atiende una conexión; admite varias peticiones seguidas (keep-alive)."""
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    metodo, ruta, version = linea.decode("latin-1").split()
+                except ValueError:
+                    await self._responder(escritor, 400, {"error": "PeticionInvalida"}, False)
+                    break
+
+                cabeceras = {}
+                while (linea := await lector.readline()) not in (b"\r\n", b"\n", b""):
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+                seguir = (cabeceras.get("connection", "").lower() != "close"
+                          and version == "HTTP/1.1") or cabeceras.get("connection", "").lower() == "keep-alive"
+
+                try:
+                    longitud = int(cabeceras.get("content-length") or 0)
+                except ValueError:
+                    longitud = -1
+                if longitud < 0:
+                    await self._responder(escritor, 400, {"error": "PeticionInvalida",
+                                                          "mensaje": "Content-Length no válido"}, False)
+                    break
+                if longitud > MAX_CUERPO:
+                    await self._responder(escritor, 413, {"error": "CuerpoDemasiadoGrande"}, False)
+                    break
+                cuerpo = await lector.readexactly(longitud) if longitud else b""
+
+                try:
+                    estado, datos = await self.despachar(metodo, ruta, cuerpo)
+                except Exception as e:  # un fallo inesperado no debe tumbar el servicio
+                    estado, datos = 500, {"error": type(e).__name__, "mensaje": str(e)}
+                await self._responder(escritor, estado, datos, seguir)
+                if not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    @staticmethod
+    async def _responder(escritor, estado, datos, seguir):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        escritor.write(
+            f"HTTP/1.1 {estado} {ESTADOS[estado]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(cuerpo)}\r\n"
+            f"Connection: {'keep-alive' if seguir else 'close'}\r\n\r\n".encode("latin-1") + cuerpo)
+        await escritor.drain()
+
+
+async def servir(host, puerto):
+    biblioteca = Biblioteca()
+    biblioteca.indice  # el índice de búsqueda se construye antes de aceptar peticiones
+    biblioteca.preparar_guardado()  # y la copia de los registros, para guardar solo los cambios
+    servicio = ServicioBiblioteca(biblioteca)
+    servicio.escritor.iniciar()
+    servidor = await asyncio.start_server(servicio.atender, host, puerto)
+    try:  # SIGTERM también guarda antes de salir
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:  # Windows
+        pass
+    print(f"📚 Biblioteca escuchando en http://{host}:{puerto} (Ctrl+C para salir)", flush=True)
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await servicio.escritor.cerrar()
+        print("💾 Datos guardados.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON de la biblioteca digital.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--directorio", default=".", help="carpeta con libros.json, usuarios.json y prestamos.json")
+    args = parser.parse_args()
+    os.chdir(args.directorio)  # Biblioteca lee los JSON del directorio actual
+    try:
+        asyncio.run(servir(args.host, args.puerto))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# ==============================
+# Verificador de integridad de los archivos de la biblioteca
+# ==============================
+# Comprueba libros.json, usuarios.json y prestamos.json leyéndolos en
+# streaming (un registro a la vez) y en tiempo lineal:
+#   - registros mal formados e ISBN / ID de usuario repetidos
+#   - préstamos de usuarios o libros inexistentes
+#   - un mismo libro prestado a dos usuarios (gana el primero, como al cargar)
+#   - libros_prestados de usuarios.json que no coincide con prestamos.json
+# Emite un informe JSON y, con --reparar, escribe un conjunto corregido.
+#
+# Uso: python verificar_integridad.py [directorio] [--informe informe.json] [--reparar carpeta]
+# Código de salida: 0 sin problemas, 1 con problemas, 2 si algún archivo no se puede leer.
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Persistencia compartida de Parcial 02 (carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from persistencia import iterar_json
+
+ARCHIVOS = {"libros": "libros.json", "usuarios": "usuarios.json", "prestamos": "prestamos.json"}
+CAMPOS_LIBRO = ("titulo", "autor", "categoria", "isbn")
+
+
+class EscritorArreglo:
+    """Escribe un arreglo JSON registro a registro en ruta.tmp; al cerrar
+    lo renombra sobre ruta."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.f = open(ruta + ".tmp", "w", encoding="utf-8")
+        self.f.write("[")
+        self.separador = "\n"
+
+    def escribir(self, registro):
+        self.f.write(self.separador + json.dumps(registro, ensure_ascii=False))
+        self.separador = ",\n"
+
+    def cerrar(self):
+        self.f.write("\n]\n")
+        self.f.close()
+        os.replace(self.ruta + ".tmp", self.ruta)
+
+
+# ==============================
+# Informe
+# ==============================
+class Informe:
+    def __init__(self, max_ejemplos):
+        self.max_ejemplos = max_ejemplos
+        self.registros = {}
+        self.problemas = Counter()
+        self.ejemplos = defaultdict(list)
+        self.errores = {}
+
+    def problema(self, tipo, **detalle):
+        self.problemas[tipo] += 1
+        if len(self.ejemplos[tipo]) < self.max_ejemplos:
+            self.ejemplos[tipo].append(detalle)
+
+    def a_dict(self, segundos):
+        return {
+            "ok": not self.problemas and not self.errores,
+            "segundos": round(segundos, 3),
+            "registros": self.registros,
+            "archivos_ilegibles": self.errores,
+            "problemas": dict(self.problemas),
+            "ejemplos": dict(self.ejemplos),
+        }
+
+
+def _fecha_valida(valor):
+    if valor is None:
+        return True
+    try:
+        datetime.fromisoformat(valor)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def isbn_de_prestamo(registro):
+    """ISBN de un préstamo en formato antiguo ("J200") o nuevo ({"isbn", "prestado", "vence"})."""
+    if isinstance(registro, str):
+        return registro
+    if (isinstance(registro, dict) and isinstance(registro.get("isbn"), str)
+            and _fecha_valida(registro.get("prestado")) and _fecha_valida(registro.get("vence"))):
+        return registro["isbn"]
+    return None
+
+
+def _abrir(directorio, nombre):
+    return open(os.path.join(directorio, ARCHIVOS[nombre]), "r", encoding="utf-8")
+
+
+# ==============================
+# Verificación
+# ==============================
+def verificar(directorio, reparar=None, max_ejemplos=20):
+    informe = Informe(max_ejemplos)
+    if reparar:
+        os.makedirs(reparar, exist_ok=True)
+
+    # 1) Libros: ISBN únicos y campos completos
+    isbns = set()
+    try:
+        with _abrir(directorio, "libros") as f:
+            for posicion, libro in enumerate(iterar_json(f)):
+                if not isinstance(libro, dict) or any(not isinstance(libro.get(c), str) for c in CAMPOS_LIBRO):
+                    informe.problema("libro_invalido", posicion=posicion)
+                elif libro["isbn"] in isbns:
+                    informe.problema("isbn_duplicado", posicion=posicion, isbn=libro["isbn"])
+                else:
+                    isbns.add(libro["isbn"])
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        informe.errores[ARCHIVOS["libros"]] = str(e)
+    informe.registros["libros"] = len(isbns)
+
+    # 2) Usuarios: ID únicos. De libros_prestados solo se guarda una huella
+    #    por usuario para compararla después con prestamos.json.
+    huellas = {}
+    try:
+        with _abrir(directorio, "usuarios") as f:
+            for posicion, usuario in enumerate(iterar_json(f)):
+                if (not isinstance(usuario, dict) or not isinstance(usuario.get("id_usuario"), str)
+                        or not isinstance(usuario.get("nombre"), str)):
+                    informe.problema("usuario_invalido", posicion=posicion)
+                elif usuario["id_usuario"] in huellas:
+                    informe.problema("usuario_duplicado", posicion=posicion, id_usuario=usuario["id_usuario"])
+                else:
+                    prestados = usuario.get("libros_prestados", [])
+                    valida = isinstance(prestados, list) and all(isinstance(i, str) for i in prestados)
+                    huellas[usuario["id_usuario"]] = hash(frozenset(prestados)) if valida else None
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        informe.errores[ARCHIVOS["usuarios"]] = str(e)
+    informe.registros["usuarios"] = len(huellas)
+
+    # 3) Préstamos: referencias válidas y cada libro con un solo dueño
+    prestado_a = {}
+    validos = defaultdict(list)  # id_usuario: registros de préstamo correctos
+    vistos = set()
+    try:
+        with _abrir(directorio, "prestamos") as f:
+            for id_usuario, lista in iterar_json(f, con_claves=True):
+                if id_usuario in vistos:
+                    # json.load se quedaría solo con la última aparición
+                    informe.problema("usuario_repetido_en_prestamos", id_usuario=id_usuario)
+                vistos.add(id_usuario)
+                if not isinstance(lista, list):
+                    informe.problema("prestamo_invalido", id_usuario=id_usuario)
+                    continue
+                for registro in lista:
+                    isbn = isbn_de_prestamo(registro)
+                    if isbn is None:
+                        informe.problema("prestamo_invalido", id_usuario=id_usuario, registro=registro)
+                    elif id_usuario not in huellas:
+                        informe.problema("prestamo_de_usuario_inexistente", id_usuario=id_usuario, isbn=isbn)
+                    elif isbn not in isbns:
+                        informe.problema("prestamo_de_libro_inexistente", id_usuario=id_usuario, isbn=isbn)
+                    elif isbn in prestado_a:
+                        informe.problema("libro_prestado_dos_veces", isbn=isbn,
+                                         primero=prestado_a[isbn], repetido=id_usuario)
+                    else:
+                        prestado_a[isbn] = id_usuario
+                        # Sin reparación basta el ISBN, que ocupa mucho menos que el registro
+                        validos[id_usuario].append(registro if reparar else isbn)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as e:
+        informe.errores[ARCHIVOS["prestamos"]] = str(e)
+    informe.registros["prestamos"] = len(prestado_a)
+
+    # 4) usuarios.json debe reflejar los préstamos válidos
+    for id_usuario, huella in huellas.items():
+        if huella != hash(frozenset(isbn_de_prestamo(r) for r in validos.get(id_usuario, ()))):
+            informe.problema("libros_prestados_inconsistente", id_usuario=id_usuario)
+
+    if reparar and not informe.errores:
+        _escribir_reparados(directorio, reparar, validos)
+    return informe
+
+
+def _escribir_reparados(directorio, reparar, validos):
+    # libros.json y usuarios.json se vuelven a leer para escribirlos sin cargarlos enteros
+    salida = EscritorArreglo(os.path.join(reparar, ARCHIVOS["libros"]))
+    escritos = set()
+    with _abrir(directorio, "libros") as f:
+        for libro in iterar_json(f):
+            if (isinstance(libro, dict) and all(isinstance(libro.get(c), str) for c in CAMPOS_LIBRO)
+                    and libro["isbn"] not in escritos):
+                escritos.add(libro["isbn"])
+                salida.escribir({c: libro[c] for c in CAMPOS_LIBRO})
+    salida.cerrar()
+
+    salida = EscritorArreglo(os.path.join(reparar, ARCHIVOS["usuarios"]))
+    escritos = set()
+    with _abrir(directorio, "usuarios") as f:
+        for usuario in iterar_json(f):
+            if (isinstance(usuario, dict) and isinstance(usuario.get("id_usuario"), str)
+                    and isinstance(usuario.get("nombre"), str) and usuario["id_usuario"] not in escritos):
+                escritos.add(usuario["id_usuario"])
+                salida.escribir({"nombre": usuario["nombre"], "id_usuario": usuario["id_usuario"],
+                                 "libros_prestados": [isbn_de_prestamo(r) for r in validos.get(usuario["id_usuario"], ())]})
+    salida.cerrar()
+
+    ruta = os.path.join(reparar, ARCHIVOS["prestamos"])
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        f.write("{")
+        separador = "\n"
+        for id_usuario, registros in validos.items():
+            f.write(f"{separador}{json.dumps(id_usuario, ensure_ascii=False)}: {json.dumps(registros, ensure_ascii=False)}")
+            separador = ",\n"
+        f.write("\n}\n")
+    os.replace(ruta + ".tmp", ruta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica la integridad de los archivos de la biblioteca.")
+    parser.add_argument("directorio", nargs="?", default=".", help="carpeta con los tres archivos JSON")
+    parser.add_argument("--informe", help="archivo donde escribir el informe JSON (por defecto, la salida estándar)")
+    parser.add_argument("--reparar", metavar="CARPETA", help="escribe en CARPETA los archivos corregidos")
+    parser.add_argument("--ejemplos", type=int, default=20, help="ejemplos guardados por tipo de problema")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    informe = verificar(args.directorio, args.reparar, args.ejemplos)
+    datos = informe.a_dict(time.perf_counter() - inicio)
+    texto = json.dumps(datos, ensure_ascii=False, indent=2)
+    if args.informe:
+        with open(args.informe, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    if args.reparar and informe.errores:
+        print("❌ No se escribieron archivos reparados: hay archivos ilegibles.", file=sys.stderr)
+    return 2 if informe.errores else 0 if datos["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
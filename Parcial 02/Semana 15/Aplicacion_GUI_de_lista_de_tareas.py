@@ -1,10 +1,16 @@
 # Aplicación GUI de lista de Tareas
 
+import os
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
 import tkinter.font as tkfont
 from datetime import datetime
 
+# Lista virtualizada compartida de Parcial 02 (carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lista_virtual import VirtualListbox
+
 class Task:
     """
     Clase que representa una tarea individual.
@@ -83,18 +89,15 @@ class TodoApp:
         self.add_button = ttk.Button(top_frame, text="Añadir Tarea", command=self.add_task)
         self.add_button.grid(row=0, column=3, pady=(0, 6))
 
-        # Frame central con Listbox y scrollbar
+        # Frame central con la lista virtualizada (Listbox + scrollbar)
         list_frame = ttk.Frame(self.root, padding=padding)
         list_frame.grid(row=1, column=0, sticky="nsew")
 
-        self.listbox = tk.Listbox(list_frame, height=12, activestyle="none", width=60)
+        self.listbox = VirtualListbox(list_frame, self._task_row, height=12, activestyle="none", width=60)
         self.listbox.grid(row=0, column=0, sticky="nsew")
         list_frame.rowconfigure(0, weight=1)
         list_frame.columnconfigure(0, weight=1)
-
-        self.scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.listbox.yview)
-        self.scrollbar.grid(row=0, column=1, sticky="ns")
-        self.listbox.configure(yscrollcommand=self.scrollbar.set)
+        self.listbox.refresh(len(self.tasks))
 
         # Frame inferior con botones "Marcar como Completada" y "Eliminar Tarea"
         bottom_frame = ttk.Frame(self.root, padding=padding)
@@ -168,7 +171,7 @@ class TodoApp:
         # Crear objeto Task y añadirlo a la lista
         task = Task(text, date)
         self.tasks.append(task)
-        self._refresh_listbox()
+        self.listbox.insert(len(self.tasks) - 1)
 
         # Limpiar campos después de añadir
         self.entry_var.set("")
@@ -182,7 +185,7 @@ class TodoApp:
             messagebox.showinfo("Información", "Seleccione una tarea para marcarla como completada.")
             return
         self.tasks[idx].toggle()
-        self._refresh_listbox()
+        self.listbox.refresh_row(idx)
 
     def delete_task(self):
         """Elimina la tarea seleccionada de la lista."""
@@ -194,7 +197,7 @@ class TodoApp:
         if not resp:
             return
         del self.tasks[idx]
-        self._refresh_listbox()
+        self.listbox.delete(idx)
 
     # -------------------
     # Eventos
@@ -208,7 +211,7 @@ class TodoApp:
         index = self.listbox.nearest(event.y)
         if 0 <= index < len(self.tasks):
             self.tasks[index].toggle()
-            self._refresh_listbox()
+            self.listbox.refresh_row(index)
             # Mantener selección en la tarea clicada
             self.listbox.selection_clear(0, tk.END)
             self.listbox.selection_set(index)
@@ -216,6 +219,13 @@ class TodoApp:
     # -------------------
     # Utilidades internas
     # -------------------
+    def _task_row(self, index: int, selected: bool):
+        """Texto y estilo de la fila de una tarea (para VirtualListbox)."""
+        task = self.tasks[index]
+        if task.completed:
+            return str(task), {"fg": "gray", "font": self.font_completed}
+        return str(task), {"fg": "black", "font": self.font_normal}
+
     def _get_selected_index(self):
         """Devuelve el índice de la tarea seleccionada o None si no hay selección."""
         sel = self.listbox.curselection()
@@ -223,22 +233,6 @@ class TodoApp:
             return None
         return sel[0]
 
-    def _refresh_listbox(self):
-        """Actualiza el Listbox según el estado de las tareas."""
-        self.listbox.delete(0, tk.END)
-        for i, task in enumerate(self.tasks):
-            self.listbox.insert(tk.END, str(task))
-            if task.completed:
-                try:
-                    self.listbox.itemconfig(i, fg="gray", font=self.font_completed)
-                except Exception:
-                    self.listbox.itemconfig(i, fg="gray")
-            else:
-                try:
-                    self.listbox.itemconfig(i, fg="black", font=self.font_normal)
-                except Exception:
-                    self.listbox.itemconfig(i, fg="black")
-
 
 def main():
     """Función principal: crea la ventana y lanza la aplicación."""
@@ -5,10 +5,23 @@ from tkinter import messagebox, Toplevel, ttk
 from datetime import datetime
 import json
 import os
+import queue
+import sys
+import threading
 
 from tkcalendar import Calendar
 
-ARCHIVO_JSON = "tareas.json"
+# Persistencia compartida de Parcial 02 (carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from persistencia import escribir_lote, leer_json_con_respaldo
+from lista_virtual import VirtualListbox
+
+ARCHIVO_JSON = "tareas.json"      # formato anterior, solo se lee para migrarlo
+ARCHIVO_TAREAS = "tareas.jsonl"
+VERSION_TAREAS = 1
+FORMATO_FECHA_HORA = "%Y-%m-%d %H:%M"
+RETARDO_GUARDADO_MS = 500  # las ediciones seguidas se agrupan en una sola escritura
+REVISION_ERRORES_MS = 200  # cada cuánto mira la interfaz si el guardado falló
 
 # Colores pastel y fuentes
 COLOR_FONDO = "#f7f5f2"
@@ -27,6 +40,86 @@ FUENTE_BOTONES = ("Comic Sans MS", 12, "bold")
 FUENTE_LISTA = ("Helvetica", 13)
 FUENTE_AUTOR = ("Comic Sans MS", 10, "italic")
 
+# Modelo de tarea
+class Tarea:
+    """
+    Tarea con la fecha y hora guardada como segundos desde la época (int),
+    o None si no tiene. Con __slots__ cada tarea ocupa bastante menos que un
+    diccionario, y ordenar o filtrar por fecha no vuelve a leer cadenas.
+    """
+    __slots__ = ("descripcion", "completada", "vence")
+
+    def __init__(self, descripcion, completada=False, vence=None):
+        self.descripcion = descripcion
+        self.completada = completada
+        self.vence = vence
+
+    @property
+    def fecha_hora(self):
+        """Fecha y hora en texto (AAAA-MM-DD HH:MM), o "" si no tiene."""
+        if self.vence is None:
+            return ""
+        return datetime.fromtimestamp(self.vence).strftime(FORMATO_FECHA_HORA)
+
+    @staticmethod
+    def epoch(fecha_hora):
+        """Convierte "AAAA-MM-DD HH:MM" a segundos; ValueError si no es válida."""
+        return int(datetime.strptime(fecha_hora, FORMATO_FECHA_HORA).timestamp()) if fecha_hora else None
+
+    def a_fila(self):
+        return [self.descripcion, int(self.completada), self.vence]
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Tarea del formato anterior (tareas.json)."""
+        return cls(datos["descripcion"], bool(datos.get("completada")), cls.epoch(datos.get("fecha_hora")))
+
+
+# Archivo de tareas: JSON Lines versionado
+# Primera línea: {"version": 1, "campos": [...]}; después una tarea por línea
+# como lista compacta [descripcion, completada, vence].
+def guardar_tareas_jsonl(ruta, tareas):
+    guardar_filas_jsonl(ruta, [tarea.a_fila() for tarea in tareas])
+
+
+def guardar_filas_jsonl(ruta, filas):
+    """Guarda filas ya convertidas con Tarea.a_fila()."""
+    def volcar(filas, f):
+        f.write(json.dumps({"version": VERSION_TAREAS, "campos": list(Tarea.__slots__)}) + "\n")
+        codificar = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        f.writelines(codificar(fila) + "\n" for fila in filas)
+    escribir_lote({ruta: filas}, volcar)
+
+
+def leer_tareas_jsonl(ruta):
+    """Lee un archivo de tareas, recurriendo a su .bak si está dañado.
+
+    Devuelve None si no hay ninguna copia legible.
+    """
+    for candidato in (ruta, ruta + ".bak"):
+        if not os.path.exists(candidato):
+            continue
+        try:
+            with open(candidato, "r", encoding="utf-8") as f:
+                cabecera = json.loads(f.readline())
+                if cabecera.get("version") != VERSION_TAREAS:
+                    raise ValueError(f"versión no soportada: {cabecera.get('version')}")
+                # Los saltos de línea dentro de los textos van escapados, así que
+                # el resto del archivo se decodifica de una vez como una lista
+                # (las líneas en blanco se ignoran)
+                lineas = [linea for linea in f.read().split("\n") if linea.strip()]
+                filas = json.loads("[" + ",".join(lineas) + "]")
+                tareas = [Tarea(descripcion, bool(completada), vence) for descripcion, completada, vence in filas]
+        except (ValueError, TypeError, AttributeError, UnicodeDecodeError) as e:
+            # json.JSONDecodeError es un ValueError
+            print(f"⚠ Archivo de tareas dañado: {candidato} ({e})")
+            continue
+        if candidato != ruta:
+            print(f"🩹 Recuperado desde la última copia válida: {candidato}")
+        return tareas
+    return None
+
+
 # Selector de fecha y hora
 class SelectorFechaHora(Toplevel):
     def __init__(self, master):
@@ -79,6 +172,86 @@ class SelectorFechaHora(Toplevel):
         self.resultado = None
         self.destroy()
 
+# Guardado en segundo plano
+class GuardadoDiferido:
+    """Guarda las tareas en un hilo, agrupando ráfagas de cambios.
+
+    programar() solo reinicia un temporizador de Tk; cuando vence, se entrega
+    al hilo una copia de las filas (Tarea.a_fila()) y el hilo hace la
+    escritura atómica. Si llegan varias copias mientras escribe, solo se
+    guarda la última. El hilo de la interfaz nunca espera al disco, salvo en
+    cerrar().
+    Tk solo se usa desde el hilo de la interfaz: el hilo deja los fallos en
+    una cola que la interfaz revisa cada REVISION_ERRORES_MS y entrega a
+    al_fallar(error).
+    """
+    def __init__(self, root, ruta, al_fallar, retardo_ms=RETARDO_GUARDADO_MS):
+        self.root = root
+        self.ruta = ruta
+        self.al_fallar = al_fallar
+        self.retardo_ms = retardo_ms
+        self._temporizador = None
+        self._datos = None          # última copia pendiente de escribir
+        self._cerrado = False
+        self._ultimo_error = None
+        self._condicion = threading.Condition()
+        self._errores = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name="guardado-tareas", daemon=True)
+        self._hilo.start()
+        self._revision = self.root.after(REVISION_ERRORES_MS, self._revisar_errores)
+
+    def programar(self, tareas):
+        if self._temporizador is not None:
+            self.root.after_cancel(self._temporizador)
+        self._temporizador = self.root.after(self.retardo_ms, self._entregar, tareas)
+
+    def _entregar(self, tareas):
+        self._temporizador = None
+        # Las filas se copian aquí: el hilo no ve las Tarea, que la interfaz
+        # puede seguir cambiando mientras se escribe
+        filas = [tarea.a_fila() for tarea in tareas]
+        with self._condicion:
+            self._datos = filas
+            self._condicion.notify()
+
+    def _revisar_errores(self):
+        while True:
+            try:
+                error = self._errores.get_nowait()
+            except queue.Empty:
+                break
+            self.al_fallar(error)
+        self._revision = self.root.after(REVISION_ERRORES_MS, self._revisar_errores)
+
+    def cerrar(self, tareas):
+        """Escribe lo pendiente y espera al hilo; devuelve el error final o None."""
+        if self._temporizador is not None:
+            self.root.after_cancel(self._temporizador)
+            self._entregar(tareas)
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify()
+        self._hilo.join()
+        self.root.after_cancel(self._revision)
+        return self._ultimo_error
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while self._datos is None and not self._cerrado:
+                    self._condicion.wait()
+                datos, self._datos = self._datos, None
+                if datos is None:
+                    return
+            try:
+                guardar_filas_jsonl(self.ruta, datos)
+                self._ultimo_error = None
+            except Exception as e:
+                self._ultimo_error = e
+                if not self._cerrado:
+                    self._errores.put(e)
+
+
 # Aplicación de tareas
 class AppTareas:
     def __init__(self, root):
@@ -88,7 +261,9 @@ class AppTareas:
         self.root.config(bg=COLOR_FONDO)
 
         self.tareas = []
+        self.guardado = GuardadoDiferido(self.root, ARCHIVO_TAREAS, self.error_al_guardar)
         self.cargar_tareas()
+        self.root.protocol("WM_DELETE_WINDOW", self.cerrar_ventana)
 
         self.crear_widgets()
         self.asignar_atajos()
@@ -124,15 +299,12 @@ class AppTareas:
         frame_lista = tk.Frame(self.root, bg=COLOR_FONDO)
         frame_lista.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
 
-        self.scrollbar = tk.Scrollbar(frame_lista)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.lista_tareas = tk.Listbox(frame_lista, font=FUENTE_LISTA, selectmode=tk.SINGLE,
-                                       yscrollcommand=self.scrollbar.set, activestyle='none')
-        self.lista_tareas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.scrollbar.config(command=self.lista_tareas.yview)
-
-        self.lista_tareas.bind("<<ListboxSelect>>", self.cambiar_color_seleccion)
+        # Solo se crean las filas visibles; la selección se colorea al dibujarlas
+        # bg va al Listbox interno: configurar VirtualListbox solo colorea su marco
+        self.lista_tareas = VirtualListbox(frame_lista, self._fila_tarea, font=FUENTE_LISTA, bg=COLOR_FONDO,
+                                           selectmode=tk.SINGLE, activestyle='none')
+        self.lista_tareas.configure(bg=COLOR_FONDO)
+        self.lista_tareas.pack(fill=tk.BOTH, expand=True)
 
         self.label_autor = tk.Label(self.root, text="Creado por Mery Jaqueline Cabrera Herrera",
                                     bg=COLOR_FONDO, fg="#a06cd5", font=FUENTE_AUTOR)  # morado clarito en el autor
@@ -168,23 +340,18 @@ class AppTareas:
             fecha_hora_str = selector.resultado
             if fecha_hora_str:
                 try:
-                    datetime.strptime(fecha_hora_str, "%Y-%m-%d %H:%M")
-                except:
+                    vence = Tarea.epoch(fecha_hora_str)
+                except ValueError:
                     messagebox.showerror("Error", "Fecha y hora inválidas.")
                     return
             else:
-                fecha_hora_str = ""
+                vence = None
         else:
-            fecha_hora_str = ""
-
-        tarea = {
-            "descripcion": descripcion,
-            "completada": False,
-            "fecha_hora": fecha_hora_str
-        }
-        self.tareas.append(tarea)
+            vence = None
+
+        self.tareas.append(Tarea(descripcion, vence=vence))
         self.entry_tarea.delete(0, tk.END)
-        self.actualizar_lista()
+        self.lista_tareas.insert(len(self.tareas) - 1)
         self.guardar_tareas()
 
     def marcar_completada(self):
@@ -193,8 +360,8 @@ class AppTareas:
             messagebox.showinfo("Selecciona una tarea", "Selecciona una tarea para marcar como completada.")
             return
         index = seleccion[0]
-        self.tareas[index]["completada"] = not self.tareas[index]["completada"]
-        self.actualizar_lista()
+        self.tareas[index].completada = not self.tareas[index].completada
+        self.lista_tareas.refresh_row(index)
         self.guardar_tareas()
 
     def eliminar_tarea(self):
@@ -205,51 +372,72 @@ class AppTareas:
         index = seleccion[0]
         if messagebox.askyesno("Confirmar eliminación", "¿Estás seguro de eliminar esta tarea?"):
             self.tareas.pop(index)
-            self.actualizar_lista()
+            self.lista_tareas.delete(index)
             self.guardar_tareas()
 
     def actualizar_lista(self):
-        self.lista_tareas.delete(0, tk.END)
-        for tarea in self.tareas:
-            texto = tarea["descripcion"]
-            if tarea["fecha_hora"]:
-                texto += f" ({tarea['fecha_hora']})"
-            if tarea["completada"]:
-                texto += " ✔"
-            self.lista_tareas.insert(tk.END, texto)
-        self.cambiar_color_seleccion()
-
-    def cambiar_color_seleccion(self, event=None):
-        for i in range(len(self.tareas)):
-            if self.tareas[i]["completada"]:
-                self.lista_tareas.itemconfig(i, fg=COLOR_TEXTO_COMPLETADO, bg=COLOR_FONDO)
-            else:
-                self.lista_tareas.itemconfig(i, fg="black", bg=COLOR_FONDO)
-
-        seleccion = self.lista_tareas.curselection()
-        if seleccion:
-            i = seleccion[0]
-            tarea = self.tareas[i]
-            if tarea["completada"]:
-                self.lista_tareas.itemconfig(i, bg=COLOR_SELECCIONADO_COMPLETADO, fg="black")
-            else:
-                self.lista_tareas.itemconfig(i, bg=COLOR_SELECCIONADO, fg="black")
+        self.lista_tareas.refresh(len(self.tareas))
+
+    def _fila_tarea(self, i, seleccionada):
+        tarea = self.tareas[i]
+        texto = tarea.descripcion
+        if tarea.vence is not None:
+            texto += f" ({tarea.fecha_hora})"
+        if tarea.completada:
+            texto += " ✔"
+        if seleccionada:
+            fondo = COLOR_SELECCIONADO_COMPLETADO if tarea.completada else COLOR_SELECCIONADO
+            return texto, {"bg": fondo, "fg": "black"}
+        return texto, {"bg": COLOR_FONDO, "fg": COLOR_TEXTO_COMPLETADO if tarea.completada else "black"}
 
     def guardar_tareas(self):
-        with open(ARCHIVO_JSON, "w", encoding="utf-8") as f:
-            json.dump(self.tareas, f, ensure_ascii=False, indent=4)
+        self.guardado.programar(self.tareas)
+
+    def error_al_guardar(self, error):
+        messagebox.showerror("Error al guardar", f"No se pudieron guardar las tareas:\n{error}")
 
     def cargar_tareas(self):
-        if os.path.exists(ARCHIVO_JSON):
-            with open(ARCHIVO_JSON, "r", encoding="utf-8") as f:
-                self.tareas = json.load(f)
+        self.tareas = leer_tareas_jsonl(ARCHIVO_TAREAS)
+        if self.tareas is not None:
+            return
+        self.tareas = []
+        danados = [r for r in (ARCHIVO_TAREAS, ARCHIVO_TAREAS + ".bak") if os.path.exists(r)]
+        if danados:
+            # tareas.jsonl existe pero ni él ni su copia se pueden leer: se
+            # apartan para no sobrescribirlos y no se migra tareas.json, que
+            # es más antiguo
+            for ruta in danados:
+                os.replace(ruta, ruta + ".corrupto")
+            messagebox.showerror("Tareas dañadas",
+                                 "No se pudo leer el archivo de tareas. Se guardó como "
+                                 + ", ".join(r + ".corrupto" for r in danados)
+                                 + " y la lista empieza vacía.")
         else:
-            self.tareas = []
+            # Migración: se lee el tareas.json anterior (que se conserva tal cual)
+            # y se guarda en el formato nuevo
+            for datos in leer_json_con_respaldo(ARCHIVO_JSON, por_defecto=[]):
+                try:
+                    self.tareas.append(Tarea.desde_dict(datos))
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    print(f"⚠ Tarea ignorada al migrar: {datos!r}")
+            if self.tareas:
+                self.guardar_tareas()
+
+    def terminar_guardado(self):
+        """Escribe los cambios pendientes antes de cerrar la aplicación."""
+        error = self.guardado.cerrar(self.tareas)
+        if error:
+            self.error_al_guardar(error)
 
     def salir_app(self):
+        self.terminar_guardado()
         messagebox.showinfo("¡Hasta luego!", "Gracias por utilizar la app 😊\nCreado por Mery Jaqueline Cabrera Herrera")
         self.root.quit()
 
+    def cerrar_ventana(self):
+        self.terminar_guardado()
+        self.root.destroy()
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = AppTareas(root)
@@ -0,0 +1,124 @@
+# ==============================
+# Benchmark: resaltado de la selección en la lista de tareas
+# ==============================
+# Genera eventos de selección (clic y flecha abajo) contra un Tk real y mide
+# el coste por evento: antes se recoloreaban todas las filas en cada
+# <<ListboxSelect>>; ahora solo se repintan la fila anterior y la nueva.
+# Sin pantalla arranca un Xvfb propio en el primer número de pantalla libre.
+#
+# Uso: python benchmark_seleccion.py [eventos]   (por defecto 500)
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+
+import Aplicacion_GUI_para_gestion_de_tareas_con_atajos_de_teclado as app
+
+TAMANOS = (1_000, 10_000, 50_000)
+
+
+def arrancar_xvfb():
+    if os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        raise SystemExit("❌ No hay pantalla (DISPLAY) ni Xvfb instalado")
+    # Con -displayfd, Xvfb elige una pantalla libre y escribe su número en
+    # la tubería cuando ya acepta conexiones (o la cierra si no arranca)
+    lectura, escritura = os.pipe()
+    servidor = subprocess.Popen(["Xvfb", "-displayfd", str(escritura), "-screen", "0", "1024x768x24"],
+                                pass_fds=(escritura,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(escritura)
+    with os.fdopen(lectura) as f:
+        pantalla = f.readline().strip()
+    if not pantalla:
+        servidor.wait()
+        raise SystemExit("❌ Xvfb no pudo arrancar")
+    os.environ["DISPLAY"] = f":{pantalla}"
+    return servidor
+
+
+def generar_tareas(n):
+    return [app.Tarea(f"Tarea {i}", i % 3 == 0, 1_735_725_600 + i * 3600 if i % 2 else None) for i in range(n)]
+
+
+# Algoritmo anterior: Listbox con todas las filas y recoloreado completo
+def lista_anterior(root, tareas):
+    lista = tk.Listbox(root, font=app.FUENTE_LISTA, selectmode=tk.SINGLE, activestyle='none')
+    lista.pack(fill=tk.BOTH, expand=True)
+    for tarea in tareas:
+        lista.insert(tk.END, tarea.descripcion)
+
+    def cambiar_color_seleccion(event=None):
+        for i in range(len(tareas)):
+            if tareas[i].completada:
+                lista.itemconfig(i, fg=app.COLOR_TEXTO_COMPLETADO, bg=app.COLOR_FONDO)
+            else:
+                lista.itemconfig(i, fg="black", bg=app.COLOR_FONDO)
+        seleccion = lista.curselection()
+        if seleccion:
+            i = seleccion[0]
+            fondo = app.COLOR_SELECCIONADO_COMPLETADO if tareas[i].completada else app.COLOR_SELECCIONADO
+            lista.itemconfig(i, bg=fondo, fg="black")
+
+    lista.bind("<<ListboxSelect>>", cambiar_color_seleccion)
+    cambiar_color_seleccion()
+    return lista
+
+
+def medir(root, lista, eventos, secuencia):
+    """ms por evento; secuencia es "clic" o "<Down>"."""
+    lista.focus_force()
+    lista.selection_set(0)
+    lista.event_generate("<<ListboxSelect>>")
+    root.update()
+    inicio = time.perf_counter()
+    for k in range(eventos):
+        if secuencia == "clic":
+            lista.selection_clear(0, tk.END)
+            lista.selection_set(k % 10)
+            lista.event_generate("<<ListboxSelect>>")
+        else:
+            lista.event_generate(secuencia)
+        root.update()
+    return (time.perf_counter() - inicio) / eventos * 1000
+
+
+def main():
+    eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    servidor = arrancar_xvfb()
+    try:
+        os.chdir(tempfile.mkdtemp())  # AppTareas lee tareas.jsonl del directorio actual
+        print(f"{'Tareas':>7} {'Evento':>7} {'Antes ms':>10} {'Ahora ms':>10}")
+        print("-" * 38)
+        for n in TAMANOS:
+            tareas = generar_tareas(n)
+            app.guardar_tareas_jsonl(app.ARCHIVO_TAREAS, tareas)
+
+            # Con "antes" las flechas solo mueven el cursor del Listbox: se
+            # mide el clic, que es lo que disparaba el recoloreado completo
+            root = tk.Tk()
+            antes = medir(root, lista_anterior(root, tareas), max(1, eventos // 10), "clic")
+            root.destroy()
+
+            root = tk.Tk()
+            aplicacion = app.AppTareas(root)
+            lista = aplicacion.lista_tareas.listbox
+            ahora_clic = medir(root, lista, eventos, "clic")
+            ahora_flecha = medir(root, lista, eventos, "<Down>")
+            aplicacion.terminar_guardado()  # detiene el hilo de guardado antes de destruir la ventana
+            root.destroy()
+
+            print(f"{n:>7} {'clic':>7} {antes:>10.2f} {ahora_clic:>10.3f}")
+            print(f"{n:>7} {'flecha':>7} {'':>10} {ahora_flecha:>10.3f}")
+    finally:
+        if servidor:
+            servidor.terminate()
+            servidor.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# ==============================
+# Benchmark: lectura incremental de JSON (persistencia.iterar_json)
+# ==============================
+# Antes de medir comprueba que iterar_json da lo mismo que json.loads con
+# cualquier tamaño de bloque (valores cortados en el límite de un bloque,
+# como "9." | "99"), que rechaza los separadores mal formados y que una
+# línea mal formada de un JSON Lines no corta la importación. Después
+# compara el tiempo y la memoria de recorrer un arreglo grande frente a
+# json.load.
+#
+# Uso: python benchmark_persistencia.py [registros]   (por defecto 1000000)
+
+from collections import namedtuple
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from persistencia import InformeCarga, cargar_por_lotes, iterar_json, leer_jsonl, validar_registro
+
+VALIDOS = [
+    '[9.99, 1e5, -3, 12345678901234567890, 1.5E-7, -0.25e+3, true, false, null, "a\\u00f1b", [1, 2], {"x": 1}]',
+    '{"a": 9.99, "b": -1e+10, "c": "texto", "d": [1.5, {"e": null}]}',
+    '[]',
+    '{}',
+]
+INVALIDOS = ['[1,,2]', '[1,]', '[1 2]', '[1', '{"a" 1}', '{"a": 1,}', '{1: 2}', '[9.]']
+Fila = namedtuple("Fila", "id nombre cantidad precio")  # elemento mínimo para cargar_por_lotes
+
+
+def leer(texto, tam_bloque):
+    con_claves = texto.lstrip().startswith("{")
+    return list(iterar_json(io.StringIO(texto), con_claves=con_claves, tam_bloque=tam_bloque))
+
+
+def comprobar():
+    for texto in VALIDOS:
+        datos = json.loads(texto)
+        esperado = list(datos.items()) if isinstance(datos, dict) else datos
+        for tam_bloque in range(1, len(texto) + 2):
+            assert leer(texto, tam_bloque) == esperado, (texto, tam_bloque)
+    # Número cortado justo en el límite del bloque por defecto (64 KiB)
+    texto = "[" + " " * ((1 << 16) - 3) + "9.99]"
+    assert leer(texto, 1 << 16) == json.loads(texto)
+    for texto in INVALIDOS:
+        for tam_bloque in (1, 2, 1 << 16):
+            try:
+                leer(texto, tam_bloque)
+            except json.JSONDecodeError:
+                continue
+            raise AssertionError(f"Se aceptó JSON inválido: {texto!r} (bloque {tam_bloque})")
+    print("✅ iterar_json coincide con json.loads y rechaza los separadores inválidos")
+
+    lineas = '{"id": "a", "nombre": "A", "cantidad": 1, "precio": 2}\n{"id": "b", roto\n\n' \
+             '{"id": "c", "nombre": "C", "cantidad": 3, "precio": 4}\n'
+    informe, cargados = InformeCarga(), []
+    cargar_por_lotes(leer_jsonl(io.StringIO(lineas)), lambda r: Fila(*validar_registro(r)), lambda _: False,
+                     cargados.extend, informe, tam_lote=1)
+    assert [e.id for e in cargados] == ["a", "c"] and informe.cargados == 2, cargados
+    assert [posicion for posicion, _ in informe.invalidos] == [2], informe.invalidos
+    print("✅ Una línea JSON mal formada se informa con su número y la importación sigue")
+
+
+
+def medir(funcion):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    total = funcion()
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return total, segundos, pico
+
+
+def main():
+    registros = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    comprobar()
+
+    ruta = os.path.join(tempfile.mkdtemp(), "datos.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump([{"id": str(i), "nombre": f"Producto {i}", "cantidad": i % 500, "precio": i * 0.01}
+                   for i in range(registros)], f)
+
+    def completo():
+        with open(ruta, encoding="utf-8") as f:
+            return len(json.load(f))
+
+    def incremental():
+        with open(ruta, encoding="utf-8") as f:
+            return sum(1 for _ in iterar_json(f))
+
+    print(f"\n{'Lectura':<14} {'Registros':>10} {'Segundos':>9} {'Pico MB':>8}")
+    print("-" * 44)
+    for nombre, funcion in (("json.load", completo), ("iterar_json", incremental)):
+        total, segundos, pico = medir(funcion)
+        print(f"{nombre:<14} {total:>10} {segundos:>9.2f} {pico / 1e6:>8.1f}")
+    os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+# ==============================
+# Lista virtualizada compartida de Parcial 02
+# ==============================
+# VirtualListbox muestra listas de cualquier tamaño creando solo las filas
+# visibles. La usan las aplicaciones de tareas de las semanas 15 y 16,
+# importándola igual que persistencia.py:
+#
+#     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+#     from lista_virtual import VirtualListbox
+
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+
+
+class VirtualListbox(tk.Frame):
+    """
+    Lista virtualizada: un Listbox que solo contiene las filas visibles y una
+    barra de desplazamiento propia que recorre el modelo completo.
+    El contenido lo da la función row(índice, seleccionada) -> (texto, opciones
+    de itemconfig), así que crear o desplazar la lista cuesta lo mismo con
+    100 tareas que con 100 000.
+    Ofrece las operaciones de Listbox que usa la aplicación (curselection,
+    selection_set, see, nearest, bind...) con índices del modelo.
+    """
+    def __init__(self, master, row, height=10, **listbox_options):
+        super().__init__(master)
+        self._row = row
+        self._size = 0
+        self._offset = 0         # índice del modelo en la primera fila visible
+        self._rows = height      # filas completas que caben en pantalla
+        self._selected = None    # índice seleccionado (del modelo)
+        self._texts = []         # texto de cada fila mostrada
+        self._item_font = True   # se desactiva si el Listbox no admite fuente por fila
+
+        # exportselection=False: la selección vive en el modelo y no debe
+        # perderse al seleccionar texto en otro widget
+        self.listbox = tk.Listbox(self, height=height, exportselection=False, **listbox_options)
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        font = tkfont.Font(font=self.listbox.cget("font"))
+        self._row_height = font.metrics("linespace") + 1 + 2 * int(self.listbox.cget("selectborderwidth"))
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<Configure>", self._on_resize)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.listbox.bind(sequence, self._on_wheel)
+        for sequence, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                               ("<Home>", "home"), ("<End>", "end")):
+            self.listbox.bind(sequence, lambda e, step=step: self._on_key(step))
+        # El Listbox interno nunca se desplaza por su cuenta (arrastre fuera del borde)
+        self.listbox.bind("<B1-Leave>", lambda e: "break")
+
+    # -------------------
+    # API tipo Listbox (índices del modelo)
+    # -------------------
+    def size(self) -> int:
+        return self._size
+
+    def curselection(self):
+        return () if self._selected is None else (self._selected,)
+
+    def selection_includes(self, index) -> bool:
+        return self._selected == self._index(index)
+
+    def selection_set(self, first, last=None):
+        self._select(self._index(first))
+
+    def selection_clear(self, first, last=None):
+        last = self._index(first if last is None else last)
+        if self._selected is not None and self._index(first) <= self._selected <= last:
+            self._select(None)
+
+    def nearest(self, y) -> int:
+        return min(self._offset + self.listbox.nearest(y), self._size - 1)
+
+    def see(self, index):
+        if self._reveal(self._index(index)):
+            self._render()
+
+    def bind(self, sequence=None, func=None, add=None):
+        # <<ListboxSelect>> se añade a la del widget, que debe ejecutarse primero
+        if sequence == "<<ListboxSelect>>":
+            add = "+"
+        return self.listbox.bind(sequence, func, add)
+
+    def focus_set(self):
+        self.listbox.focus_set()
+
+    # -------------------
+    # Cambios del modelo: cada uno toca como mucho las filas visibles
+    # -------------------
+    def refresh(self, size: int):
+        """Vuelve a mostrar la vista con un modelo de size elementos."""
+        self._size = size
+        if self._selected is not None and self._selected >= size:
+            self._selected = None
+        self._render()
+
+    def insert(self, index: int):
+        """Se insertó un elemento en la posición index del modelo."""
+        self._size += 1
+        if self._selected is not None and self._selected >= index:
+            self._selected += 1
+        if index < self._offset:
+            self._offset += 1        # lo visible no cambia
+            self._update_scrollbar()
+        elif index <= self._offset + self._rows:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def delete(self, index: int):
+        """Se eliminó el elemento index del modelo."""
+        self._size -= 1
+        if self._selected == index:
+            self._selected = None
+        elif self._selected is not None and self._selected > index:
+            self._selected -= 1
+        if index < self._offset:
+            self._offset -= 1
+            self._update_scrollbar()
+        elif index <= self._offset + self._rows:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def refresh_row(self, index: int):
+        """El elemento index cambió: se actualiza su fila solo si está a la vista."""
+        row = index - self._offset
+        if not 0 <= row < len(self._texts):
+            return
+        text, options = self._row(index, index == self._selected)
+        if text != self._texts[row]:
+            # Listbox no permite cambiar el texto de una fila: se reemplaza
+            self.listbox.delete(row)
+            self.listbox.insert(row, text)
+            self._texts[row] = text
+            if index == self._selected:
+                self.listbox.selection_set(row)
+        self._style(row, options)
+
+    # -------------------
+    # Interno
+    # -------------------
+    def _index(self, index) -> int:
+        return self._size - 1 if index == tk.END else int(index)
+
+    def _reveal(self, index: int) -> bool:
+        """Desplaza la vista hasta que index sea visible; True si se movió."""
+        if index < self._offset:
+            self._offset = index
+        elif index >= self._offset + self._rows:
+            self._offset = index - self._rows + 1
+        else:
+            return False
+        return True
+
+    def _select(self, index):
+        """Cambia la selección volviendo a pintar solo la fila anterior y la nueva."""
+        previous, self._selected = self._selected, index
+        self.listbox.selection_clear(0, tk.END)
+        for i in (previous, index):
+            if i is not None:
+                self._restyle(i)
+        if index is not None and 0 <= index - self._offset < len(self._texts):
+            self.listbox.selection_set(index - self._offset)
+
+    def _restyle(self, index: int):
+        # La selección no cambia el texto, solo el estilo de la fila
+        row = index - self._offset
+        if 0 <= row < len(self._texts):
+            self._style(row, self._row(index, index == self._selected)[1])
+
+    def _render(self):
+        """Vuelve a crear las filas visibles (más una parcial al pie)."""
+        self._offset = max(0, min(self._offset, self._size - self._rows))
+        end = min(self._size, self._offset + self._rows + 1)
+        rows = [self._row(i, i == self._selected) for i in range(self._offset, end)]
+        self._texts = [text for text, _ in rows]
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(0, *self._texts)
+            for row, (_, options) in enumerate(rows):
+                self._style(row, options)
+        if self._selected is not None and self._offset <= self._selected < end:
+            self.listbox.selection_set(self._selected - self._offset)
+        self.listbox.yview(0)
+        self._update_scrollbar()
+
+    def _style(self, row: int, options: dict):
+        if "font" in options:
+            if self._item_font:
+                try:
+                    self.listbox.itemconfig(row, **options)
+                    return
+                except tk.TclError:
+                    # Se comprueba una sola vez: después cada fila cuesta una llamada a Tk
+                    self._item_font = False
+            options = {k: v for k, v in options.items() if k != "font"}
+        self.listbox.itemconfig(row, **options)
+
+    def _update_scrollbar(self):
+        if self._size == 0:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self._offset / self._size, min(1.0, (self._offset + self._rows) / self._size))
+
+    def _scroll_to(self, offset: int):
+        offset = max(0, min(offset, self._size - self._rows))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * self._size))
+        else:
+            step = self._rows if unit == "pages" else 1
+            self._scroll_to(self._offset + int(amount) * step)
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_to(self._offset + (-3 if up else 3))
+        return "break"
+
+    def _on_key(self, step):
+        if self._size == 0:
+            return "break"
+        current = self._offset if self._selected is None else self._selected
+        if step == "home":
+            target = 0
+        elif step == "end":
+            target = self._size - 1
+        elif step in ("page", "-page"):
+            target = current + (self._rows if step == "page" else -self._rows)
+        else:
+            target = current + step
+        target = max(0, min(target, self._size - 1))
+        if self._reveal(target):
+            self._selected = target
+            self._render()
+        else:
+            self._select(target)
+        self.listbox.event_generate("<<ListboxSelect>>")
+        return "break"
+
+    def _on_select(self, event=None):
+        selection = self.listbox.curselection()
+        selected = self._offset + selection[0] if selection else None
+        if selected != self._selected:
+            self._select(selected)
+
+    def _on_resize(self, event):
+        border = 2 * (int(self.listbox.cget("borderwidth")) + int(self.listbox.cget("highlightthickness")))
+        rows = max(1, (event.height - border) // self._row_height)
+        if rows != self._rows:
+            self._rows = rows
+            self._render()
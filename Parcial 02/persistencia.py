@@ -0,0 +1,405 @@
+# ==============================
+# Persistencia compartida de Parcial 02
+# ==============================
+# Escritura atómica con copia .bak, lectura con recuperación desde esa copia,
+# lectura incremental de archivos JSON grandes e importación/exportación
+# masiva de productos (CSV, JSON Lines o JSON) por lotes.
+# Los programas de cada semana la importan añadiendo esta carpeta a sys.path:
+#
+#     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+#     from persistencia import escribir_json_atomico
+
+import csv
+import json
+import os
+import shutil
+
+
+# ----------------------------
+# Escritura atómica
+# ----------------------------
+def escribir_lote(archivos, volcar):
+    """Confirma juntos varios archivos ({ruta: datos}); volcar(datos, f) escribe cada uno.
+
+    Primero se escriben y sincronizan todos los temporales; solo después se
+    renombran sobre los destinos, guardando la versión anterior en .bak.
+    Un cierre inesperado deja siempre los archivos viejos o los nuevos, nunca
+    un archivo a medio escribir.
+    """
+    temporales = []
+    try:
+        for ruta, datos in archivos.items():
+            temporal = ruta + ".tmp"
+            temporales.append(temporal)
+            with open(temporal, "w", encoding="utf-8") as f:
+                volcar(datos, f)
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        for temporal in temporales:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        raise
+
+    for ruta in archivos:
+        if os.path.exists(ruta):
+            _rotar_respaldo(ruta)
+        os.replace(ruta + ".tmp", ruta)
+    for directorio in {os.path.dirname(os.path.abspath(r)) for r in archivos}:
+        _sincronizar_directorio(directorio)
+
+
+def escribir_json_lote(archivos, **opciones_json):
+    """Confirma juntos varios archivos JSON ({ruta: datos})."""
+    escribir_lote(archivos, lambda datos, f: json.dump(datos, f, **opciones_json))
+
+
+def escribir_json_atomico(ruta, datos, **opciones_json):
+    """Escribe un único archivo JSON de forma atómica."""
+    escribir_json_lote({ruta: datos}, **opciones_json)
+
+
+# ----------------------------
+# Lectura con respaldo
+# ----------------------------
+def leer_json_con_respaldo(ruta, por_defecto=None):
+    """Lee un archivo JSON; si falta o está corrupto, recurre a su copia .bak."""
+    for candidato in (ruta, ruta + ".bak"):
+        if not os.path.exists(candidato):
+            continue
+        try:
+            with open(candidato, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            print(f"⚠ Archivo corrupto: {candidato}")
+            continue
+        if candidato != ruta:
+            print(f"🩹 Recuperado desde la última copia válida: {candidato}")
+        return datos
+    return por_defecto
+
+
+def _rotar_respaldo(ruta):
+    # Enlace duro cuando se puede: el destino nunca deja de existir
+    respaldo = ruta + ".bak"
+    if os.path.exists(respaldo):
+        os.remove(respaldo)
+    try:
+        os.link(ruta, respaldo)
+    except OSError:
+        shutil.copy2(ruta, respaldo)
+
+
+def _sincronizar_directorio(directorio):
+    # Persiste los renombrados (solo en sistemas POSIX)
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directorio, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ----------------------------
+# Lectura incremental
+# ----------------------------
+MAX_ELEMENTO = 1 << 24  # caracteres como máximo por elemento (16 Mi)
+CARACTERES_NUMERO = "0123456789.eE+-"
+
+
+def iterar_json(f, con_claves=False, tam_bloque=1 << 16, max_elemento=MAX_ELEMENTO):
+    """Recorre un arreglo JSON (elementos) o un objeto JSON (pares clave,
+    valor) de primer nivel sin cargar el archivo completo en memoria.
+
+    Ante un contenido inválido lanza json.JSONDecodeError con la línea,
+    columna y carácter del archivo completo. El búfer nunca pasa de unos
+    max_elemento caracteres, aunque el archivo esté dañado.
+    """
+    decodificador = json.JSONDecoder()
+    buffer, pos, fin = "", 0, False
+    base, lineas, columna = 0, 0, 0  # posición en el archivo de buffer[0]
+
+    def leer_mas():
+        nonlocal buffer, pos, fin, base, lineas, columna
+        bloque = f.read(tam_bloque)
+        fin = not bloque
+        leido = buffer[:pos]
+        saltos = leido.count("\n")
+        columna = len(leido) - leido.rfind("\n") - 1 if saltos else columna + len(leido)
+        lineas += saltos
+        base += len(leido)
+        buffer, pos = buffer[pos:] + bloque, 0
+        return not fin
+
+    def error(mensaje, en):
+        linea = lineas + buffer.count("\n", 0, en) + 1
+        inicio_linea = buffer.rfind("\n", 0, en)
+        col = en - inicio_linea if inicio_linea >= 0 else columna + en + 1
+        e = json.JSONDecodeError(mensaje, buffer, en)
+        e.pos, e.lineno, e.colno = base + en, linea, col
+        e.args = (f"{mensaje}: línea {linea} columna {col} (carácter {base + en})",)
+        return e
+
+    def saltar():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or not leer_mas():
+                return
+
+    def decodificar():
+        nonlocal pos
+        while True:
+            try:
+                valor, final = decodificador.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Solo puede faltar texto si el error está al final del búfer
+                # (literales de hasta 6 caracteres, como un escape \uXXXX) o
+                # es una cadena sin cerrar; lo demás es un error definitivo
+                incompleto = e.pos >= len(buffer) - 6 or e.msg.startswith("Unterminated string")
+                if not incompleto or fin:
+                    raise error(e.msg, e.pos) from None
+                if len(buffer) - pos > max_elemento:
+                    raise error(f"Elemento de más de {max_elemento} caracteres", pos) from None
+                leer_mas()
+                continue
+            # Un número al final del bloque podría estar cortado ("9." | "99",
+            # "1e" | "5"): mientras lo que queda sea parte de un número se lee
+            # más y se reintenta
+            if (not fin and isinstance(valor, (int, float)) and not isinstance(valor, bool)
+                    and (final == len(buffer) or buffer[final] in CARACTERES_NUMERO)
+                    and not buffer[final:].strip(CARACTERES_NUMERO)):
+                if len(buffer) - pos > max_elemento:
+                    raise error(f"Elemento de más de {max_elemento} caracteres", pos)
+                if leer_mas():
+                    continue
+            pos = final
+            return valor
+
+    abre, cierra = ("{", "}") if con_claves else ("[", "]")
+    saltar()
+    if pos >= len(buffer) or buffer[pos] != abre:
+        raise error(f"Se esperaba '{abre}' al inicio", pos)
+    pos += 1
+    saltar()
+    if pos < len(buffer) and buffer[pos] == cierra:
+        return
+    while True:
+        saltar()
+        if pos >= len(buffer):
+            raise error(f"Falta '{cierra}' al final", pos)
+        if con_claves:
+            if buffer[pos] != '"':
+                raise error("Se esperaba una clave entre comillas", pos)
+            clave = decodificar()
+            saltar()
+            if pos >= len(buffer) or buffer[pos] != ":":
+                raise error("Se esperaba ':'", pos)
+            pos += 1
+            saltar()
+            yield clave, decodificar()
+        else:
+            yield decodificar()
+        # Tras cada elemento solo puede venir una coma (y otro elemento) o el cierre
+        saltar()
+        if pos >= len(buffer):
+            raise error(f"Falta '{cierra}' al final", pos)
+        if buffer[pos] == cierra:
+            return
+        if buffer[pos] != ",":
+            raise error(f"Se esperaba ',' o '{cierra}'", pos)
+        pos += 1
+
+
+# ----------------------------
+# Importación y exportación masiva de productos
+# ----------------------------
+CAMPOS_PRODUCTO = ["id", "nombre", "cantidad", "precio"]
+FORMATOS = (".csv", ".jsonl", ".ndjson", ".json")
+
+# Codificadores creados una vez: json.dumps con opciones crea uno por llamada
+_codificar = json.JSONEncoder(ensure_ascii=False).encode
+_codificar_linea = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class InformeCarga:
+    """Resultado de una carga: lo que no se pudo cargar se informa en vez de abortar."""
+
+    def __init__(self, origen=""):
+        self.cargados = 0
+        self.duplicados = []
+        self.invalidos = []  # (posición, motivo)
+        self.origen = origen
+
+
+# Reglas de validación de los productos (las mismas que los setters de Semana 11)
+def validar_nombre(value):
+    if not value.strip():
+        raise ValueError("El nombre no puede estar vacío.")
+    return value.strip()
+
+
+def validar_cantidad(value):
+    if value < 0:
+        raise ValueError("La cantidad debe ser >= 0.")
+    return value
+
+
+def validar_precio(value):
+    if value < 0:
+        raise ValueError("El precio debe ser >= 0.")
+    return round(value, 2)
+
+
+def validar_registro(registro):
+    """(id, nombre, cantidad, precio) de un registro importado ya validado.
+
+    Lanza KeyError, TypeError o ValueError si el registro no es válido.
+    """
+    pid = str(registro["id"]).strip()
+    if not pid:
+        raise ValueError("El ID no puede estar vacío.")
+    cantidad = registro["cantidad"]
+    if isinstance(cantidad, bool) or not isinstance(cantidad, int):
+        raise ValueError(f"Cantidad no entera: {cantidad!r}")
+    return (pid, validar_nombre(str(registro["nombre"])),
+            validar_cantidad(cantidad), validar_precio(float(registro["precio"])))
+
+
+def formato_de(ruta):
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in FORMATOS:
+        raise ValueError(f"Formato no soportado: '{extension}' (use .csv, .jsonl o .json)")
+    return extension
+
+
+def lineas_jsonl(registros):
+    """Texto JSON Lines de los registros: una línea compacta por registro."""
+    return "".join(_codificar_linea(registro) + "\n" for registro in registros)
+
+
+def leer_jsonl(f):
+    """Genera (línea, registro) de un archivo JSON Lines.
+
+    Una línea mal formada no corta la lectura: se entrega como
+    (línea, json.JSONDecodeError) para que la carga la informe y siga.
+    """
+    for numero, linea in enumerate(f, 1):
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, e
+
+
+def leer_csv(f, enteros=("cantidad",)):
+    """Genera (línea, fila) de un CSV con encabezado."""
+    lector = csv.reader(f)
+    encabezado = next(lector, [])
+    for valores in lector:
+        fila = dict(zip(encabezado, valores))
+        # En CSV todo es texto: los enteros se convierten aquí y, si no lo
+        # son, se dejan tal cual para que la validación los rechace
+        for campo in enteros:
+            try:
+                fila[campo] = int(fila[campo])
+            except (KeyError, ValueError):
+                pass
+        yield lector.line_num, fila
+
+
+def leer_registros(ruta):
+    """Genera (posición, registro) de un CSV, JSON Lines o arreglo JSON.
+
+    La posición es la línea del archivo (CSV y JSON Lines) o el número de
+    elemento (JSON). Un arreglo JSON mal formado sí corta la lectura con
+    json.JSONDecodeError: a partir del error no se puede seguir leyendo.
+    """
+    formato = formato_de(ruta)
+    with open(ruta, "r", encoding="utf-8", newline="") as f:
+        if formato == ".csv":
+            yield from leer_csv(f)
+        elif formato == ".json":
+            yield from enumerate(iterar_json(f), 1)
+        else:
+            yield from leer_jsonl(f)
+
+
+def cargar_por_lotes(registros, crear, existe, anadir_lote, informe,
+                     tam_lote=5000, progreso=None, al_confirmar=None):
+    """Valida, descarta duplicados e inserta por lotes los (posición, registro).
+
+    crear(registro) devuelve el elemento validado (con atributo id) o lanza
+    KeyError, TypeError o ValueError; existe(id) dice si ya está cargado.
+    anadir_lote(lote) inserta los elementos nuevos y puede devolver los IDs
+    que rechazó; al_confirmar(lote), si se da, se llama una vez por lote ya
+    insertado (p. ej. para persistirlo). progreso(n) recibe los registros
+    procesados hasta el momento.
+    """
+    lote = []
+    en_lote = set()
+    procesados = 0
+
+    def confirmar():
+        rechazados = anadir_lote(lote) or []
+        if al_confirmar is not None:
+            al_confirmar(lote)
+        informe.cargados += len(lote) - len(rechazados)
+        informe.duplicados.extend(rechazados)
+        lote.clear()
+        en_lote.clear()
+        if progreso is not None:
+            progreso(procesados)
+
+    for posicion, registro in registros:
+        procesados += 1
+        if isinstance(registro, ValueError):  # línea ilegible (ver leer_jsonl)
+            informe.invalidos.append((posicion, f"{type(registro).__name__}: {registro}"))
+            continue
+        try:
+            elemento = crear(registro)
+        except (KeyError, TypeError, ValueError) as e:
+            informe.invalidos.append((posicion, f"{type(e).__name__}: {e}"))
+            continue
+        if elemento.id in en_lote or existe(elemento.id):
+            informe.duplicados.append(elemento.id)
+            continue
+        lote.append(elemento)
+        en_lote.add(elemento.id)
+        if len(lote) >= tam_lote:
+            confirmar()
+    if lote:
+        confirmar()
+
+
+def exportar_registros(ruta, registros):
+    """Escribe registros (diccionarios con CAMPOS_PRODUCTO) en CSV, JSON Lines
+    o JSON según la extensión de ruta, de forma atómica y sin armar el archivo
+    completo en memoria. Devuelve cuántos registros se escribieron."""
+    formato = formato_de(ruta)
+    total = 0
+
+    def volcar(registros, f):
+        nonlocal total
+        if formato == ".csv":
+            escritor = csv.writer(f, lineterminator="\n")
+            escritor.writerow(CAMPOS_PRODUCTO)
+            for registro in registros:
+                escritor.writerow([registro[campo] for campo in CAMPOS_PRODUCTO])
+                total += 1
+        elif formato == ".json":
+            f.write("[")
+            for registro in registros:
+                f.write((",\n  " if total else "\n  ") + _codificar(registro))
+                total += 1
+            f.write("\n]\n" if total else "]\n")
+        else:
+            for registro in registros:
+                f.write(_codificar_linea(registro) + "\n")
+                total += 1
+
+    escribir_lote({ruta: registros}, volcar)
+    return total